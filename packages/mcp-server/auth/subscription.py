@@ -165,10 +165,11 @@ class SubscriptionRequired:
             kwargs["subscription_tier"] = user_tier
 
             # Log successful authorization
-            logger.debug(
-                f"Subscription authorized: user={user_id}, "
-                f"tier={user_tier}, function={func.__name__}"
-            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Subscription authorized: user=%s, tier=%s, function=%s",
+                    user_id, user_tier, func.__name__
+                )
 
             # Call the original function
             try:
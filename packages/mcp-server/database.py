@@ -7,16 +7,138 @@ Handles exploit data, user subscriptions, and rate limiting.
 
 import sqlite3
 import logging
+import queue
+import threading
+import time
 from contextlib import contextmanager
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 
+class InMemoryRateLimiter:
+    """
+    Process-local request counters bucketed by time.
+
+    Counters are ephemeral, so they are kept in memory rather than written
+    to SQLite on every request. They reset on restart and are not shared
+    between processes.
+
+    Requests are counted per second, as the rate_limits rows were, so the
+    window slides with one-second precision and windows of any length are
+    honoured exactly.
+    """
+
+    BUCKET_SECONDS = 1
+    SWEEP_INTERVAL_SECONDS = 300
+
+    def __init__(self):
+        self._counters: Dict[Tuple[str, str], Dict[int, int]] = {}
+        self._lock = threading.Lock()
+        self._max_span = 1
+        self._last_sweep = time.monotonic()
+
+    def check(self, user_id: str, endpoint: str, limit: int, window_seconds: int) -> bool:
+        """
+        Count a request if it is under the limit for the window.
+
+        Args:
+            user_id: User identifier
+            endpoint: API endpoint
+            limit: Maximum requests allowed
+            window_seconds: Time window in seconds
+
+        Returns:
+            True if under limit, False if exceeded
+        """
+        bucket = int(time.time()) // self.BUCKET_SECONDS
+        span = max(1, -(-window_seconds // self.BUCKET_SECONDS))
+        first_bucket = bucket - span + 1
+
+        with self._lock:
+            counts = self._counters.setdefault((user_id, endpoint), {})
+            total = sum(count for b, count in counts.items() if b >= first_bucket)
+            if total >= limit:
+                return False
+
+            counts[bucket] = counts.get(bucket, 0) + 1
+            self._max_span = max(self._max_span, span)
+            self._sweep(bucket)
+            return True
+
+    def _sweep(self, bucket: int):
+        """Drop buckets older than any window in use (caller holds the lock)."""
+        now = time.monotonic()
+        if now - self._last_sweep < self.SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_sweep = now
+
+        oldest = bucket - self._max_span + 1
+        for key in list(self._counters):
+            counts = self._counters[key]
+            for b in [b for b in counts if b < oldest]:
+                del counts[b]
+            if not counts:
+                del self._counters[key]
+
+
 class Database:
     """SQLite database manager for KAMIYO MCP server."""
 
+    # Tiers change rarely, so lookups are served from memory for a short window
+    TIER_CACHE_TTL_SECONDS = 60
+    TIER_CACHE_MAX_SIZE = 1024
+
+    # Idle connections kept open for reuse; extra connections opened under
+    # load are closed when returned to a full pool
+    POOL_SIZE = 8
+
+    # Per-connection settings; synchronous=NORMAL is safe under WAL and skips
+    # the fsync on every commit
+    CONNECTION_PRAGMAS = (
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA cache_size=-65536",
+    )
+
+    # Compiled statements kept per connection; tool queries come in a
+    # handful of fixed shapes, so they are parsed once per connection
+    STATEMENT_CACHE_SIZE = 256
+
+    # Columns added to exploits after the original schema, in dependency
+    # order. protocol_lc and is_test are derived at write time so queries
+    # can filter on them instead of calling LOWER() on every row.
+    EXPLOIT_EXTRA_COLUMNS = (
+        ("category", "category TEXT"),
+        ("source_url", "source_url TEXT"),
+        ("protocol_lc", "protocol_lc TEXT GENERATED ALWAYS AS (LOWER(protocol)) VIRTUAL"),
+        ("is_test", """is_test INTEGER GENERATED ALWAYS AS (
+            LOWER(protocol) LIKE '%test%' OR LOWER(COALESCE(category, '')) LIKE '%test%'
+        ) VIRTUAL"""),
+        # Bitmask of known attack patterns in category (see CATEGORY_FLAGS)
+        ("category_flags", """category_flags INTEGER GENERATED ALWAYS AS (
+            (LOWER(COALESCE(category, '')) LIKE '%flash loan%')
+            | ((LOWER(COALESCE(category, '')) LIKE '%reentrancy%') << 1)
+            | ((LOWER(COALESCE(category, '')) LIKE '%oracle%') << 2)
+            | ((LOWER(COALESCE(category, '')) LIKE '%access control%'
+                OR LOWER(COALESCE(category, '')) LIKE '%admin%') << 3)
+        ) VIRTUAL"""),
+    )
+
+    # Bits of exploits.category_flags
+    CATEGORY_FLAGS = {
+        "flash_loan": 1 << 0,
+        "reentrancy": 1 << 1,
+        "oracle": 1 << 2,
+        "access_control": 1 << 3,
+    }
+
+    # Hot-path statement, kept as a constant so every call hands sqlite3
+    # the identical string and hits its per-connection statement cache
+    USER_TIER_SQL = "SELECT tier FROM users WHERE user_id = ?"
+
     def __init__(self, db_path: str = "data/kamiyo.db"):
         """
         Initialize database connection.
@@ -25,6 +147,10 @@ class Database:
             db_path: Path to SQLite database file
         """
         self.db_path = db_path
+        self._tier_cache: Dict[str, Tuple[float, str]] = {}
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=self.POOL_SIZE)
+        self._ro_pool: "queue.Queue[sqlite3.Connection]" = queue.Queue(maxsize=self.POOL_SIZE)
+        self._rate_limiter = InMemoryRateLimiter()
         self._ensure_db_directory()
         self._initialize_schema()
 
@@ -38,6 +164,10 @@ class Database:
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
+            # WAL is persistent in the database file and lets readers run
+            # alongside the rate limit and dispute writers
+            cursor.execute("PRAGMA journal_mode=WAL")
+
             # Exploits table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS exploits (
@@ -52,6 +182,14 @@ class Database:
                 )
             """)
 
+            # Bring older exploits tables up to date; table_xinfo also lists
+            # generated columns
+            cursor.execute("PRAGMA table_xinfo(exploits)")
+            existing_columns = {row["name"] for row in cursor.fetchall()}
+            for name, definition in self.EXPLOIT_EXTRA_COLUMNS:
+                if name not in existing_columns:
+                    cursor.execute(f"ALTER TABLE exploits ADD COLUMN {definition}")
+
             # Users table
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS users (
@@ -102,28 +240,183 @@ class Database:
                 CREATE INDEX IF NOT EXISTS idx_exploits_timestamp
                 ON exploits(timestamp)
             """)
+            # Partial index over real (non-test) exploits: the time range is
+            # a seek and the protocol match is checked on index entries
+            # before any table row is read
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_exploits_live_timestamp
+                ON exploits(timestamp, protocol_lc) WHERE is_test = 0
+            """)
             cursor.execute("""
                 CREATE INDEX IF NOT EXISTS idx_rate_limits_user
                 ON rate_limits(user_id, window_start)
             """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_disputes_user_id
+                ON disputes(user_id)
+            """)
+
+            self._initialize_protocol_stats(cursor)
 
             conn.commit()
-            logger.info(f"Database initialized at {self.db_path}")
+            logger.info("Database initialized at %s", self.db_path)
+
+    def _initialize_protocol_stats(self, cursor: sqlite3.Cursor):
+        """
+        Create the per-protocol daily rollup of non-test exploits.
+
+        Peer comparisons aggregate this table instead of scanning exploits.
+        Triggers keep it in step with every insert, update and delete.
+
+        Args:
+            cursor: Cursor on the connection initializing the schema
+        """
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'protocol_stats'"
+        )
+        is_new = cursor.fetchone() is None
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS protocol_stats (
+                protocol TEXT NOT NULL,
+                chain TEXT NOT NULL,
+                day TEXT NOT NULL,
+                exploit_count INTEGER NOT NULL DEFAULT 0,
+                total_loss REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (protocol, chain, day)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_protocol_stats_day
+            ON protocol_stats(day, chain)
+        """)
+
+        # Backfill once, from rows that predate the triggers
+        if is_new:
+            cursor.execute("""
+                INSERT INTO protocol_stats (protocol, chain, day, exploit_count, total_loss)
+                SELECT protocol, chain, date(timestamp, 'unixepoch'), COUNT(*), SUM(amount_usd)
+                FROM exploits
+                WHERE is_test = 0
+                GROUP BY protocol, chain, date(timestamp, 'unixepoch')
+            """)
+
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_protocol_stats_insert
+            AFTER INSERT ON exploits WHEN NEW.is_test = 0
+            BEGIN
+                INSERT INTO protocol_stats (protocol, chain, day, exploit_count, total_loss)
+                VALUES (NEW.protocol, NEW.chain, date(NEW.timestamp, 'unixepoch'), 1, NEW.amount_usd)
+                ON CONFLICT(protocol, chain, day) DO UPDATE SET
+                    exploit_count = exploit_count + 1,
+                    total_loss = total_loss + excluded.total_loss;
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_protocol_stats_delete
+            AFTER DELETE ON exploits WHEN OLD.is_test = 0
+            BEGIN
+                UPDATE protocol_stats SET
+                    exploit_count = exploit_count - 1,
+                    total_loss = total_loss - OLD.amount_usd
+                WHERE protocol = OLD.protocol AND chain = OLD.chain
+                AND day = date(OLD.timestamp, 'unixepoch');
+                DELETE FROM protocol_stats WHERE exploit_count <= 0
+                AND protocol = OLD.protocol AND chain = OLD.chain
+                AND day = date(OLD.timestamp, 'unixepoch');
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_protocol_stats_update
+            AFTER UPDATE OF protocol, chain, amount_usd, timestamp, category ON exploits
+            BEGIN
+                UPDATE protocol_stats SET
+                    exploit_count = exploit_count - 1,
+                    total_loss = total_loss - OLD.amount_usd
+                WHERE OLD.is_test = 0 AND protocol = OLD.protocol AND chain = OLD.chain
+                AND day = date(OLD.timestamp, 'unixepoch');
+                DELETE FROM protocol_stats WHERE exploit_count <= 0
+                AND protocol = OLD.protocol AND chain = OLD.chain
+                AND day = date(OLD.timestamp, 'unixepoch');
+                INSERT INTO protocol_stats (protocol, chain, day, exploit_count, total_loss)
+                SELECT NEW.protocol, NEW.chain, date(NEW.timestamp, 'unixepoch'), 1, NEW.amount_usd
+                WHERE NEW.is_test = 0
+                ON CONFLICT(protocol, chain, day) DO UPDATE SET
+                    exploit_count = exploit_count + 1,
+                    total_loss = total_loss + excluded.total_loss;
+            END
+        """)
+
+    def _new_connection(self, readonly: bool = False) -> sqlite3.Connection:
+        """Open a connection with row access and pragmas applied."""
+        # Pooled connections are handed to worker threads (asyncio.to_thread),
+        # but only ever to one borrower at a time
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=self.STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        if readonly:
+            conn.execute("PRAGMA query_only=1")
+        return conn
 
     @contextmanager
+    def _borrow(self, pool: "queue.Queue[sqlite3.Connection]", readonly: bool):
+        """Borrow a connection from pool, returning it on a clean exit."""
+        try:
+            conn = pool.get_nowait()
+        except queue.Empty:
+            conn = self._new_connection(readonly)
+
+        try:
+            yield conn
+        except BaseException:
+            # Don't return a connection in an unknown state to the pool
+            conn.close()
+            raise
+
+        # Discard anything left uncommitted, as closing used to
+        conn.rollback()
+        try:
+            pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
     def get_connection(self):
         """
         Get database connection context manager.
 
+        Connections are borrowed from a small pool and returned on exit, so
+        the open and pragma setup cost is paid once per connection.
+
         Yields:
             sqlite3.Connection: Database connection
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        try:
-            yield conn
-        finally:
-            conn.close()
+        return self._borrow(self._pool, readonly=False)
+
+    def get_ro_connection(self):
+        """
+        Get read-only database connection context manager.
+
+        Like get_connection, from a separate pool whose connections have
+        query_only set, for tool queries that never write.
+
+        Yields:
+            sqlite3.Connection: Read-only database connection
+        """
+        return self._borrow(self._ro_pool, readonly=True)
+
+    def close(self):
+        """Close all idle pooled connections."""
+        for pool in (self._pool, self._ro_pool):
+            while True:
+                try:
+                    pool.get_nowait().close()
+                except queue.Empty:
+                    break
 
     def execute_with_retry(
         self,
@@ -157,9 +450,9 @@ class Database:
                         return None
             except sqlite3.OperationalError as e:
                 if attempt == max_retries - 1:
-                    logger.error(f"Database query failed after {max_retries} attempts: {e}")
+                    logger.error("Database query failed after %d attempts: %s", max_retries, e)
                     raise
-                logger.warning(f"Database query attempt {attempt + 1} failed, retrying: {e}")
+                logger.warning("Database query attempt %d failed, retrying: %s", attempt + 1, e)
 
         return None
 
@@ -225,23 +518,35 @@ class Database:
         Returns:
             Subscription tier (free, personal, team, enterprise)
         """
-        query = "SELECT tier FROM users WHERE user_id = ?"
-        rows = self.execute_with_retry(query, (user_id,), readonly=True)
+        now = time.monotonic()
+        cached = self._tier_cache.get(user_id)
+        if cached and now - cached[0] < self.TIER_CACHE_TTL_SECONDS:
+            return cached[1]
 
-        if rows and len(rows) > 0:
-            return rows[0]['tier']
+        rows = self.execute_with_retry(self.USER_TIER_SQL, (user_id,), readonly=True)
 
-        # Default to free tier for new users
-        self.execute_with_retry(
-            "INSERT OR IGNORE INTO users (user_id, tier) VALUES (?, ?)",
-            (user_id, 'free')
-        )
-        return 'free'
+        if rows and len(rows) > 0:
+            tier = rows[0]['tier']
+        else:
+            # Default to free tier for new users
+            self.execute_with_retry(
+                "INSERT OR IGNORE INTO users (user_id, tier) VALUES (?, ?)",
+                (user_id, 'free')
+            )
+            tier = 'free'
+
+        if len(self._tier_cache) >= self.TIER_CACHE_MAX_SIZE:
+            self._tier_cache.clear()
+        self._tier_cache[user_id] = (now, tier)
+        return tier
 
     def check_rate_limit(self, user_id: str, endpoint: str, limit: int, window_seconds: int = 3600) -> bool:
         """
         Check if user has exceeded rate limit.
 
+        Counters are held in memory (see InMemoryRateLimiter), so this
+        never touches SQLite.
+
         Args:
             user_id: User identifier
             endpoint: API endpoint
@@ -251,36 +556,7 @@ class Database:
         Returns:
             True if under limit, False if exceeded
         """
-        import time
-        current_time = int(time.time())
-        window_start = current_time - window_seconds
-
-        with self.get_connection() as conn:
-            cursor = conn.cursor()
-
-            # Get current count
-            cursor.execute("""
-                SELECT SUM(request_count) as total
-                FROM rate_limits
-                WHERE user_id = ? AND endpoint = ? AND window_start > ?
-            """, (user_id, endpoint, window_start))
-
-            row = cursor.fetchone()
-            current_count = row['total'] if row and row['total'] else 0
-
-            if current_count >= limit:
-                return False
-
-            # Increment counter
-            cursor.execute("""
-                INSERT INTO rate_limits (user_id, endpoint, request_count, window_start)
-                VALUES (?, ?, 1, ?)
-                ON CONFLICT(user_id, endpoint, window_start)
-                DO UPDATE SET request_count = request_count + 1
-            """, (user_id, endpoint, current_time))
-
-            conn.commit()
-            return True
+        return self._rate_limiter.check(user_id, endpoint, limit, window_seconds)
 
     def record_dispute(self, transaction_id: str, user_id: str, quality_score: int, refund_percentage: int):
         """
@@ -308,27 +584,24 @@ class Database:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
 
-                # Check exploits count
-                cursor.execute("SELECT COUNT(*) as count FROM exploits")
-                exploit_count = cursor.fetchone()['count']
-
-                # Check users count
-                cursor.execute("SELECT COUNT(*) as count FROM users")
-                user_count = cursor.fetchone()['count']
-
-                # Check disputes count
-                cursor.execute("SELECT COUNT(*) as count FROM disputes")
-                dispute_count = cursor.fetchone()['count']
+                # Probe all table counts in a single round trip
+                cursor.execute("""
+                    SELECT
+                        (SELECT COUNT(*) FROM exploits) as exploit_count,
+                        (SELECT COUNT(*) FROM users) as user_count,
+                        (SELECT COUNT(*) FROM disputes) as dispute_count
+                """)
+                counts = cursor.fetchone()
 
                 return {
                     "status": "healthy",
-                    "exploit_count": exploit_count,
-                    "user_count": user_count,
-                    "dispute_count": dispute_count,
+                    "exploit_count": counts['exploit_count'],
+                    "user_count": counts['user_count'],
+                    "dispute_count": counts['dispute_count'],
                     "db_path": self.db_path
                 }
         except Exception as e:
-            logger.error(f"Database health check failed: {e}")
+            logger.error("Database health check failed: %s", e)
             return {
                 "status": "unhealthy",
                 "error": str(e)
@@ -354,7 +627,7 @@ class Database:
                 """, exploit)
             conn.commit()
 
-        logger.info(f"Seeded {len(sample_exploits)} sample exploits")
+        logger.info("Seeded %d sample exploits", len(sample_exploits))
 
 
 # Global database instance
@@ -5,7 +5,7 @@ x402Resolve MCP Server
 MCP server enabling AI agents to pay for APIs with automatic quality guarantees,
 escrow protection, and trustless dispute resolution on Solana.
 
-This server provides 8 MCP tools for autonomous agent transactions:
+This server provides 10 MCP tools for autonomous agent transactions:
 - create_escrow: Lock payment before API call
 - call_api_with_escrow: Pay + call + assess in one step
 - assess_data_quality: Evaluate API response quality
@@ -14,14 +14,18 @@ This server provides 8 MCP tools for autonomous agent transactions:
 - get_api_reputation: Check provider trust score
 - verify_payment: Confirm payment received
 - estimate_refund: Calculate refund by quality score
+- create_escrow_batch: Create several escrows concurrently
+- check_escrow_status_batch: Monitor several escrows in one RPC call
 """
 
 import sys
 import os
 import asyncio
 import logging
-from datetime import datetime
-from typing import Any, Dict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict
+
+import orjson
 
 # Add current directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
@@ -47,8 +51,13 @@ from tools.x402resolve import (
     check_escrow_status,
     get_api_reputation,
     verify_payment,
-    estimate_refund
+    estimate_refund,
+    create_escrow_batch,
+    check_escrow_status_batch,
+    close_http_client,
+    MAX_BATCH_SIZE
 )
+from utils.solana_client import SOLANA_RPC_URL, X402_PROGRAM_ID
 
 # Configure logging
 logging.basicConfig(
@@ -67,202 +76,266 @@ server = Server("x402resolve")
 server_start_time: datetime | None = None
 
 
-@server.list_tools()
-async def list_tools() -> list[Tool]:
-    """List available MCP tools"""
-    return [
-        Tool(
-            name="create_escrow",
-            description="Create escrow payment for HTTP 402 API call with quality guarantee",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "api_provider": {
-                        "type": "string",
-                        "description": "API provider wallet address"
-                    },
-                    "amount_sol": {
-                        "type": "number",
-                        "description": "Payment amount in SOL (0.001-1000)"
-                    },
-                    "api_endpoint": {
-                        "type": "string",
-                        "description": "API endpoint URL"
-                    },
-                    "quality_threshold": {
-                        "type": "integer",
-                        "description": "Minimum quality score 0-100 (default: 80)",
-                        "default": 80
-                    },
-                    "time_lock_hours": {
-                        "type": "integer",
-                        "description": "Escrow expiry in hours (default: 24)",
-                        "default": 24
-                    }
+# orjson options for every tool result
+_JSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS
+    | orjson.OPT_NAIVE_UTC
+    | orjson.OPT_UTC_Z
+    | orjson.OPT_SERIALIZE_NUMPY
+)
+
+
+def _to_text(obj: Any) -> TextContent:
+    """Serialize a tool result as compact JSON text content"""
+    # The stdio transport escapes this string again inside each JSON-RPC
+    # frame, so skip indentation whitespace and newlines. Tools may return
+    # datetimes (naive ones are UTC) and numpy scalars/arrays as-is.
+    return TextContent(
+        type="text",
+        text=orjson.dumps(obj, option=_JSON_OPTIONS).decode()
+    )
+
+
+# Property schemas shared by several tools; the Tool models hold references
+# to these, so treat them as read-only
+_API_PROVIDER_PROP = {"type": "string", "description": "API provider wallet address"}
+_API_ENDPOINT_PROP = {"type": "string", "description": "API endpoint URL"}
+_ESCROW_ADDRESS_PROP = {"type": "string", "description": "Escrow account address"}
+_CREATE_ESCROW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "api_provider": _API_PROVIDER_PROP,
+        "amount_sol": {
+            "type": "number",
+            "description": "Payment amount in SOL (0.001-1000)"
+        },
+        "api_endpoint": _API_ENDPOINT_PROP,
+        "quality_threshold": {
+            "type": "integer",
+            "description": "Minimum quality score 0-100 (default: 80)",
+            "default": 80
+        },
+        "time_lock_hours": {
+            "type": "integer",
+            "description": "Escrow expiry in hours (default: 24)",
+            "default": 24
+        }
+    },
+    "required": ["api_provider", "amount_sol", "api_endpoint"]
+}
+
+# Tool definitions are static, so build them once at import time
+_TOOLS: list[Tool] = [
+    Tool(
+        name="create_escrow",
+        description="Create escrow payment for HTTP 402 API call with quality guarantee",
+        inputSchema=_CREATE_ESCROW_SCHEMA
+    ),
+    Tool(
+        name="call_api_with_escrow",
+        description="Create escrow + call API + auto-assess quality in one step",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "api_provider": _API_PROVIDER_PROP,
+                "amount_sol": {
+                    "type": "number",
+                    "description": "Payment amount in SOL"
                 },
-                "required": ["api_provider", "amount_sol", "api_endpoint"]
-            }
-        ),
-        Tool(
-            name="call_api_with_escrow",
-            description="Create escrow + call API + auto-assess quality in one step",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "api_provider": {
-                        "type": "string",
-                        "description": "API provider wallet address"
-                    },
-                    "amount_sol": {
-                        "type": "number",
-                        "description": "Payment amount in SOL"
-                    },
-                    "api_endpoint": {
-                        "type": "string",
-                        "description": "API endpoint URL"
-                    },
-                    "request_body": {
-                        "type": "object",
-                        "description": "Optional POST body for API request"
-                    },
-                    "quality_criteria": {
-                        "type": "object",
-                        "description": "Quality requirements",
-                        "properties": {
-                            "min_records": {"type": "integer"},
-                            "required_fields": {"type": "array", "items": {"type": "string"}},
-                            "max_age_days": {"type": "integer"},
-                            "schema": {"type": "object"}
-                        }
-                    }
+                "api_endpoint": _API_ENDPOINT_PROP,
+                "request_body": {
+                    "type": "object",
+                    "description": "Optional POST body for API request"
                 },
-                "required": ["api_provider", "amount_sol", "api_endpoint"]
-            }
-        ),
-        Tool(
-            name="assess_data_quality",
-            description="Assess quality of API response against expected criteria",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "data": {
-                        "type": "object",
-                        "description": "API response data to assess"
-                    },
-                    "expected_criteria": {
-                        "type": "object",
-                        "description": "Quality requirements",
-                        "properties": {
-                            "min_records": {"type": "integer", "description": "Minimum number of records"},
-                            "required_fields": {"type": "array", "items": {"type": "string"}},
-                            "max_age_days": {"type": "integer", "description": "Maximum data age"},
-                            "schema": {"type": "object", "description": "Expected JSON schema"}
-                        }
+                "quality_criteria": {
+                    "type": "object",
+                    "description": "Quality requirements",
+                    "properties": {
+                        "min_records": {"type": "integer"},
+                        "required_fields": {"type": "array", "items": {"type": "string"}},
+                        "max_age_days": {"type": "integer"},
+                        "schema": {"type": "object"}
                     }
+                }
+            },
+            "required": ["api_provider", "amount_sol", "api_endpoint"]
+        }
+    ),
+    Tool(
+        name="assess_data_quality",
+        description="Assess quality of API response against expected criteria",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "data": {
+                    "type": "object",
+                    "description": "API response data to assess"
                 },
-                "required": ["data", "expected_criteria"]
-            }
-        ),
-        Tool(
-            name="file_dispute",
-            description="File dispute for escrow due to poor quality data",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "escrow_address": {
-                        "type": "string",
-                        "description": "Escrow account address"
-                    },
-                    "quality_score": {
-                        "type": "integer",
-                        "description": "Assessed quality score (0-100)"
-                    },
-                    "evidence": {
-                        "type": "object",
-                        "description": "Dispute evidence",
-                        "properties": {
-                            "original_query": {"type": "string"},
-                            "data_received": {"type": "object"},
-                            "issues": {"type": "array", "items": {"type": "string"}}
-                        }
-                    },
-                    "refund_percentage": {
-                        "type": "integer",
-                        "description": "Requested refund percentage (0-100)"
+                "expected_criteria": {
+                    "type": "object",
+                    "description": "Quality requirements",
+                    "properties": {
+                        "min_records": {"type": "integer", "description": "Minimum number of records"},
+                        "required_fields": {"type": "array", "items": {"type": "string"}},
+                        "max_age_days": {"type": "integer", "description": "Maximum data age"},
+                        "schema": {"type": "object", "description": "Expected JSON schema"}
                     }
+                }
+            },
+            "required": ["data", "expected_criteria"]
+        }
+    ),
+    Tool(
+        name="file_dispute",
+        description="File dispute for escrow due to poor quality data",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "escrow_address": _ESCROW_ADDRESS_PROP,
+                "quality_score": {
+                    "type": "integer",
+                    "description": "Assessed quality score (0-100)"
                 },
-                "required": ["escrow_address", "quality_score", "evidence", "refund_percentage"]
-            }
-        ),
-        Tool(
-            name="check_escrow_status",
-            description="Check status of an escrow payment",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "escrow_address": {
-                        "type": "string",
-                        "description": "Escrow account address"
+                "evidence": {
+                    "type": "object",
+                    "description": "Dispute evidence",
+                    "properties": {
+                        "original_query": {"type": "string"},
+                        "data_received": {"type": "object"},
+                        "issues": {"type": "array", "items": {"type": "string"}}
                     }
                 },
-                "required": ["escrow_address"]
-            }
-        ),
-        Tool(
-            name="get_api_reputation",
-            description="Check on-chain reputation of an API provider",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "api_provider": {
-                        "type": "string",
-                        "description": "API provider wallet address"
-                    }
+                "refund_percentage": {
+                    "type": "integer",
+                    "description": "Requested refund percentage (0-100)"
+                }
+            },
+            "required": ["escrow_address", "quality_score", "evidence", "refund_percentage"]
+        }
+    ),
+    Tool(
+        name="check_escrow_status",
+        description="Check status of an escrow payment",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "escrow_address": _ESCROW_ADDRESS_PROP
+            },
+            "required": ["escrow_address"]
+        }
+    ),
+    Tool(
+        name="get_api_reputation",
+        description="Check on-chain reputation of an API provider",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "api_provider": _API_PROVIDER_PROP
+            },
+            "required": ["api_provider"]
+        }
+    ),
+    Tool(
+        name="verify_payment",
+        description="Verify that a payment was received",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "transaction_hash": {
+                    "type": "string",
+                    "description": "Solana transaction hash"
                 },
-                "required": ["api_provider"]
-            }
-        ),
-        Tool(
-            name="verify_payment",
-            description="Verify that a payment was received",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "transaction_hash": {
-                        "type": "string",
-                        "description": "Solana transaction hash"
-                    },
-                    "expected_amount": {
-                        "type": "number",
-                        "description": "Optional expected amount in SOL"
-                    },
-                    "expected_recipient": {
-                        "type": "string",
-                        "description": "Optional expected recipient address"
-                    }
+                "expected_amount": {
+                    "type": "number",
+                    "description": "Optional expected amount in SOL"
                 },
-                "required": ["transaction_hash"]
-            }
-        ),
-        Tool(
-            name="estimate_refund",
-            description="Estimate refund amount based on quality score",
-            inputSchema={
-                "type": "object",
-                "properties": {
-                    "amount_sol": {
-                        "type": "number",
-                        "description": "Payment amount in SOL"
-                    },
-                    "quality_score": {
-                        "type": "integer",
-                        "description": "Quality score (0-100)"
-                    }
+                "expected_recipient": {
+                    "type": "string",
+                    "description": "Optional expected recipient address"
+                }
+            },
+            "required": ["transaction_hash"]
+        }
+    ),
+    Tool(
+        name="estimate_refund",
+        description="Estimate refund amount based on quality score",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "amount_sol": {
+                    "type": "number",
+                    "description": "Payment amount in SOL"
                 },
-                "required": ["amount_sol", "quality_score"]
-            }
-        )
-    ]
+                "quality_score": {
+                    "type": "integer",
+                    "description": "Quality score (0-100)"
+                }
+            },
+            "required": ["amount_sol", "quality_score"]
+        }
+    ),
+    Tool(
+        name="create_escrow_batch",
+        description="Create several escrow payments concurrently",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "escrows": {
+                    "type": "array",
+                    "description": "create_escrow arguments for each escrow",
+                    "items": _CREATE_ESCROW_SCHEMA,
+                    "minItems": 1,
+                    "maxItems": MAX_BATCH_SIZE
+                }
+            },
+            "required": ["escrows"]
+        }
+    ),
+    Tool(
+        name="check_escrow_status_batch",
+        description="Check status of several escrow payments in one RPC call",
+        inputSchema={
+            "type": "object",
+            "properties": {
+                "escrow_addresses": {
+                    "type": "array",
+                    "items": _ESCROW_ADDRESS_PROP,
+                    "minItems": 1,
+                    "maxItems": MAX_BATCH_SIZE
+                }
+            },
+            "required": ["escrow_addresses"]
+        }
+    )
+]
+
+
+@server.list_tools()
+async def list_tools() -> list[Tool]:
+    """List available MCP tools"""
+    return _TOOLS
+
+
+# Tool name -> handler
+_HANDLERS: Dict[str, Callable[..., Any]] = {
+    "create_escrow": create_escrow,
+    "call_api_with_escrow": call_api_with_escrow,
+    "assess_data_quality": assess_data_quality,
+    "file_dispute": file_dispute,
+    "check_escrow_status": check_escrow_status,
+    "get_api_reputation": get_api_reputation,
+    "verify_payment": verify_payment,
+    "estimate_refund": estimate_refund,
+    "create_escrow_batch": create_escrow_batch,
+    "check_escrow_status_batch": check_escrow_status_batch,
+}
+
+# Handlers that return a result directly rather than a coroutine
+_SYNC_TOOLS = frozenset(
+    name for name, handler in _HANDLERS.items()
+    if not asyncio.iscoroutinefunction(handler)
+)
 
 
 @server.call_tool()
@@ -270,66 +343,43 @@ async def call_tool(name: str, arguments: Dict[str, Any]) -> list[TextContent]:
     """Handle tool calls from MCP clients"""
     global server_start_time
 
-    logger.info(f"Tool called: {name} with args: {arguments}")
+    logger.info("Tool called: %s with args: %s", name, arguments)
 
     try:
-        # Route to appropriate tool handler
-        if name == "create_escrow":
-            result = await create_escrow(**arguments)
-
-        elif name == "call_api_with_escrow":
-            result = await call_api_with_escrow(**arguments)
-
-        elif name == "assess_data_quality":
-            result = await assess_data_quality(**arguments)
-
-        elif name == "file_dispute":
-            result = await file_dispute(**arguments)
-
-        elif name == "check_escrow_status":
-            result = await check_escrow_status(**arguments)
-
-        elif name == "get_api_reputation":
-            result = await get_api_reputation(**arguments)
-
-        elif name == "verify_payment":
-            result = await verify_payment(**arguments)
-
-        elif name == "estimate_refund":
-            result = estimate_refund(**arguments)
-
-        else:
+        handler = _HANDLERS.get(name)
+        if handler is None:
             raise ValueError(f"Unknown tool: {name}")
 
-        # Format result as JSON
-        import json
-        result_text = json.dumps(result, indent=2)
+        if name in _SYNC_TOOLS:
+            # Keep blocking work off the stdio event loop
+            result = await asyncio.to_thread(handler, **arguments)
+        else:
+            result = await handler(**arguments)
 
-        logger.info(f"Tool {name} completed successfully")
-        return [TextContent(type="text", text=result_text)]
+        logger.info("Tool %s completed successfully", name)
+        return [_to_text(result)]
 
     except Exception as e:
-        logger.error(f"Error in tool {name}: {e}", exc_info=True)
+        logger.error("Error in tool %s: %s", name, e, exc_info=True)
         error_result = {
             "error": str(type(e).__name__),
             "message": str(e),
             "tool": name
         }
-        import json
-        return [TextContent(type="text", text=json.dumps(error_result, indent=2))]
+        return [_to_text(error_result)]
 
 
 async def main():
     """Run the MCP server"""
     global server_start_time
-    server_start_time = datetime.now()
+    server_start_time = datetime.now(timezone.utc)
 
     logger.info("="*60)
     logger.info("x402Resolve MCP Server Starting")
     logger.info("="*60)
-    logger.info(f"Solana RPC: {os.getenv('SOLANA_RPC_URL', 'https://api.devnet.solana.com')}")
-    logger.info(f"Program ID: {os.getenv('X402_PROGRAM_ID', 'E5EiaJhbg6Bav1v3P211LNv1tAqa4fHVeuGgRBHsEu6n')}")
-    logger.info(f"Log Level: {os.getenv('LOG_LEVEL', 'INFO')}")
+    logger.info("Solana RPC: %s", SOLANA_RPC_URL)
+    logger.info("Program ID: %s", X402_PROGRAM_ID)
+    logger.info("Log Level: %s", os.getenv("LOG_LEVEL", "INFO"))
     logger.info("="*60)
     logger.info("Available tools:")
     logger.info("  1. create_escrow - Create payment escrow")
@@ -340,22 +390,34 @@ async def main():
     logger.info("  6. get_api_reputation - Check provider trust")
     logger.info("  7. verify_payment - Confirm payment")
     logger.info("  8. estimate_refund - Calculate refund")
+    logger.info("  9. create_escrow_batch - Create several escrows")
+    logger.info("  10. check_escrow_status_batch - Monitor several escrows")
     logger.info("="*60)
 
-    async with stdio_server() as (read_stream, write_stream):
-        logger.info("MCP server ready - waiting for connections...")
-        await server.run(
-            read_stream,
-            write_stream,
-            server.create_initialization_options()
-        )
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            logger.info("MCP server ready - waiting for connections...")
+            await server.run(
+                read_stream,
+                write_stream,
+                server.create_initialization_options()
+            )
+    finally:
+        await close_http_client()
 
 
 if __name__ == "__main__":
+    # Prefer the libuv-backed loop where it is available
+    try:
+        import uvloop
+        run = uvloop.run
+    except ImportError:
+        run = asyncio.run
+
     try:
-        asyncio.run(main())
+        run(main())
     except KeyboardInterrupt:
         logger.info("\nShutting down MCP server...")
     except Exception as e:
-        logger.error(f"Fatal error: {e}", exc_info=True)
+        logger.error("Fatal error: %s", e, exc_info=True)
         sys.exit(1)
@@ -6,7 +6,8 @@ assess_defi_protocol_risk, monitor_wallet, and file_dispute.
 """
 
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import AsyncMock, Mock, patch, MagicMock
+import sqlite3
 import sys
 import os
 
@@ -19,10 +20,10 @@ from database import Database, initialize_database
 class TestDatabase:
     """Test database functionality."""
 
-    @pytest.fixture
-    def db(self, tmp_path):
-        """Create test database."""
-        db_path = tmp_path / "test.db"
+    @pytest.fixture(scope="module")
+    def db(self, tmp_path_factory):
+        """Create test database, shared by tests that use distinct user ids."""
+        db_path = tmp_path_factory.mktemp("db") / "test.db"
         return initialize_database(str(db_path), seed=True)
 
     def test_database_initialization(self, db):
@@ -69,6 +70,92 @@ class TestDatabase:
         tier2 = db.get_user_tier('test_user')
         assert tier2 == 'free'
 
+    def test_get_user_tier_cached(self, db):
+        """Test user tier lookups are served from cache within the TTL."""
+        assert db.get_user_tier('cached_user') == 'free'
+
+        db.execute_with_retry(
+            "UPDATE users SET tier = ? WHERE user_id = ?",
+            ('team', 'cached_user')
+        )
+        assert db.get_user_tier('cached_user') == 'free'
+
+        db._tier_cache.clear()
+        assert db.get_user_tier('cached_user') == 'team'
+
+    def test_exploit_test_rows_flagged(self, tmp_path):
+        """Test protocol_lc and is_test are derived on insert."""
+        db = Database(str(tmp_path / "flags.db"))
+        db.execute_with_retry("""
+            INSERT INTO exploits (protocol, chain, tx_hash, amount_usd, timestamp, category)
+            VALUES ('Curve', 'Ethereum', '0x1', 1.0, 1, 'Reentrancy'),
+                   ('TestSwap', 'Ethereum', '0x2', 1.0, 1, NULL),
+                   ('Aave', 'Ethereum', '0x3', 1.0, 1, 'testnet drill')
+        """)
+
+        rows = db.execute_with_retry(
+            "SELECT protocol_lc, is_test FROM exploits ORDER BY id",
+            readonly=True
+        )
+        assert [(r['protocol_lc'], r['is_test']) for r in rows] == [
+            ('curve', 0), ('testswap', 1), ('aave', 1)
+        ]
+
+    def test_exploit_category_flags(self, tmp_path):
+        """Test category_flags marks known attack patterns."""
+        db = Database(str(tmp_path / "categories.db"))
+        db.execute_with_retry("""
+            INSERT INTO exploits (protocol, chain, tx_hash, amount_usd, timestamp, category)
+            VALUES ('Curve', 'Ethereum', '0x1', 1.0, 1, 'Reentrancy'),
+                   ('Mango', 'Solana', '0x2', 1.0, 1, 'Oracle / Flash Loan'),
+                   ('Ronin', 'Ethereum', '0x3', 1.0, 1, 'Compromised admin key'),
+                   ('Euler', 'Ethereum', '0x4', 1.0, 1, NULL)
+        """)
+
+        rows = db.execute_with_retry(
+            "SELECT category_flags FROM exploits ORDER BY id",
+            readonly=True
+        )
+        flags = Database.CATEGORY_FLAGS
+        assert [r['category_flags'] for r in rows] == [
+            flags['reentrancy'],
+            flags['oracle'] | flags['flash_loan'],
+            flags['access_control'],
+            0
+        ]
+
+    def test_protocol_stats_tracks_exploits(self, tmp_path):
+        """Test the protocol_stats rollup follows inserts and deletes."""
+        db = Database(str(tmp_path / "stats.db"))
+        db.execute_with_retry("""
+            INSERT INTO exploits (protocol, chain, tx_hash, amount_usd, timestamp)
+            VALUES ('Curve', 'Ethereum', '0x1', 10.0, 86400),
+                   ('Curve', 'Ethereum', '0x2', 5.0, 86500),
+                   ('TestSwap', 'Ethereum', '0x3', 1.0, 86400)
+        """)
+        db.execute_with_retry("DELETE FROM exploits WHERE tx_hash = '0x1'")
+
+        rows = db.execute_with_retry(
+            "SELECT protocol, day, exploit_count, total_loss FROM protocol_stats",
+            readonly=True
+        )
+        assert [tuple(r) for r in rows] == [('Curve', '1970-01-02', 1, 5.0)]
+
+    def test_connection_pool_reuse(self, db):
+        """Test connections are returned to the pool and reused."""
+        with db.get_connection() as conn1:
+            pass
+        with db.get_connection() as conn2:
+            pass
+        assert conn1 is conn2
+
+    def test_ro_connection_rejects_writes(self, db):
+        """Test read-only connections can query but not write."""
+        with db.get_ro_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM exploits").fetchone()[0] == 5
+            with pytest.raises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM exploits")
+
     def test_rate_limiting(self, db):
         """Test rate limiting functionality."""
         user_id = 'test_user'
@@ -84,6 +171,39 @@ class TestDatabase:
         allowed = db.check_rate_limit(user_id, endpoint, limit=limit)
         assert allowed is False
 
+    def test_rate_limiting_per_endpoint(self, db):
+        """Test rate limit counters are tracked per endpoint."""
+        assert db.check_rate_limit('limit_user', 'search', limit=1) is True
+        assert db.check_rate_limit('limit_user', 'search', limit=1) is False
+        assert db.check_rate_limit('limit_user', 'risk', limit=1) is True
+
+    def test_rate_limit_window_slides(self, db):
+        """Test the window slides by the second, including short windows."""
+        clock = [1_000_079.0]
+
+        with patch('database.time.time', side_effect=lambda: clock[0]):
+            # Two requests just before a minute boundary use up the limit...
+            assert db.check_rate_limit('slide_user', 'search', limit=2, window_seconds=60)
+            assert db.check_rate_limit('slide_user', 'search', limit=2, window_seconds=60)
+
+            # ...which still holds just after it
+            clock[0] = 1_000_080.0
+            assert not db.check_rate_limit('slide_user', 'search', limit=2, window_seconds=60)
+            clock[0] = 1_000_138.0
+            assert not db.check_rate_limit('slide_user', 'search', limit=2, window_seconds=60)
+
+            # Both requests leave the window 60s after they were made
+            clock[0] = 1_000_139.0
+            assert db.check_rate_limit('slide_user', 'search', limit=2, window_seconds=60)
+
+            # Windows under a minute are honoured as given
+            clock[0] = 2_000_000.0
+            assert db.check_rate_limit('short_user', 'search', limit=1, window_seconds=10)
+            clock[0] = 2_000_009.0
+            assert not db.check_rate_limit('short_user', 'search', limit=1, window_seconds=10)
+            clock[0] = 2_000_010.0
+            assert db.check_rate_limit('short_user', 'search', limit=1, window_seconds=10)
+
     def test_record_dispute(self, db):
         """Test recording dispute."""
         db.record_dispute(
@@ -213,6 +333,416 @@ class TestQualityScoring:
         assert calculate_refund_percentage(50) == 50  # Boundary: 50-79
         assert calculate_refund_percentage(49) == 100 # Just below
 
+    @pytest.mark.parametrize("backend", ["numpy", "python"])
+    def test_estimate_refund_batch_matches_scalar(self, backend, monkeypatch):
+        """Batch refunds agree with estimate_refund for each escrow."""
+        from utils import quality_assessment as qa
+
+        if backend == "numpy" and qa.np is None:
+            pytest.skip("numpy not installed")
+        if backend == "python":
+            monkeypatch.setattr(qa, "np", None)
+
+        scores = [0, 49, 49.99, 50, 50.01, 65, 79, 79.99, 80, 80.01, 100]
+        amounts = [0.001, 1.5, 0.123456789, 2, 0.5, 10, 0.75, 3.3, 1, 0.25, 42]
+
+        batch = qa.estimate_refund_batch(amounts, scores)
+
+        for i, (amount, score) in enumerate(zip(amounts, scores)):
+            expected = qa.estimate_refund(amount, score)
+            assert int(batch["refund_percentage"][i]) == expected["refund_percentage"], score
+            assert round(float(batch["refund_sol"][i]), 6) == expected["refund_sol"], score
+            assert round(float(batch["payment_sol"][i]), 6) == expected["payment_sol"], score
+
+    def test_assess_records_matches_assess(self):
+        """Per-record batch scores agree with assessing each record alone."""
+        from utils.quality_assessment import QualityAssessment
+
+        assessor = QualityAssessment()
+        criteria = {"required_fields": ["a", "b"]}
+        records = [{"a": 1, "b": 2}, {"a": 1, "b": ""}, {"a": None}, {}]
+
+        results = assessor.assess_records(records, criteria)
+
+        assert len(results) == len(records)
+        for record, result in zip(records, results):
+            expected = assessor.assess(record, criteria, use_cache=False)
+            assert result["quality_score"] == expected["quality_score"]
+            assert result["refund_percentage"] == expected["refund_percentage"]
+
+    def test_schema_scoring_uses_builtin_rules(self):
+        """Schema scores follow the built-in type/property rules."""
+        from utils.quality_assessment import QualityAssessment
+
+        assessor = QualityAssessment()
+
+        # JSON "number" maps to float
+        score, issues = assessor._validate_schema(5, {"type": "number"})
+        assert score == 50
+        assert issues == ["Type mismatch: Expected number, got int"]
+
+        schema = {
+            "type": "object",
+            "properties": {"a": {}, "b": {"default": 1}},
+            "required": ["a"]
+        }
+        data = {"a": 1}
+        score, issues = assessor._validate_schema(data, schema)
+        assert score == 75
+        assert issues == ["Missing property: b"]
+        assert data == {"a": 1}
+
+    def test_invalid_schema_still_scores(self):
+        """Keywords outside the built-in rules, even invalid ones, are ignored."""
+        from utils.quality_assessment import QualityAssessment
+
+        schema = {"type": "object", "pattern": "("}
+        result = QualityAssessment().assess({"a": 1}, {"schema": schema}, use_cache=False)
+        assert 0 <= result["quality_score"] <= 100
+
+    def test_fast_path_reports_skipped_check(self):
+        """A check skipped on the fast path is flagged, not scored."""
+        from utils.quality_assessment import QualityAssessment
+
+        assessor = QualityAssessment()
+        criteria = {"required_fields": ["a", "b"], "max_age_days": 1, "min_records": 5}
+        data = [{"timestamp": "2000-01-01T00:00:00Z"}]
+
+        fast = assessor.assess(data, criteria, use_cache=False, fast_path=True)
+        full = assessor.assess(data, criteria, use_cache=False)
+
+        assert fast["assessment_details"]["schema_compliance"] == "skipped"
+        assert full["assessment_details"]["schema_compliance"] != "skipped"
+        assert fast["refund_percentage"] == full["refund_percentage"] == 100
+
+
+class TestEscrowTools:
+    """Test x402Resolve escrow tools with the Solana client mocked out."""
+
+    def test_call_api_with_invalid_schema_pattern(self):
+        """An unusable schema keyword doesn't fail a call whose escrow exists."""
+        import asyncio
+        import httpx
+        from tools import x402resolve
+
+        async def create_escrow(**kwargs):
+            return {"escrow_address": "escrow", "payment_proof": "proof"}
+
+        api = httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json={"a": 1})
+        ))
+
+        with patch.object(x402resolve, "create_escrow", create_escrow), \
+                patch.object(x402resolve, "_get_http_client", return_value=api):
+            result = asyncio.run(x402resolve.call_api_with_escrow(
+                "provider", 0.01, "https://api.example/data",
+                quality_criteria={"schema": {"type": "object", "pattern": "("}}
+            ))
+
+        assert result["escrow_address"] == "escrow"
+        assert result["api_response"] == {"a": 1}
+
+    def test_create_escrow_batch_isolates_bad_items(self):
+        """An item with bad arguments gets an error entry in its position."""
+        import asyncio
+        from tools import x402resolve
+
+        async def create_escrow(api_provider, amount_sol, api_endpoint, **kwargs):
+            return {"escrow_address": f"escrow-{api_provider}"}
+
+        escrows = [
+            {"api_provider": "a", "amount_sol": 0.01, "api_endpoint": "https://a"},
+            {"api_provider": "b", "amount": 0.01, "api_endpoint": "https://b"},
+            {"api_provider": "c", "amount_sol": 0.01, "api_endpoint": "https://c"},
+        ]
+
+        with patch.object(x402resolve, "create_escrow", create_escrow):
+            results = asyncio.run(x402resolve.create_escrow_batch(escrows))
+
+        assert results[0] == {"escrow_address": "escrow-a"}
+        assert results[1]["error"] == "TypeError"
+        assert results[2] == {"escrow_address": "escrow-c"}
+
+
+    def test_reputation_cache_returns_copies(self):
+        """Mutating a returned reputation doesn't alter later cache hits."""
+        import asyncio
+        from tools import x402resolve
+
+        solana = Mock()
+        solana.get_api_reputation = AsyncMock(side_effect=lambda provider: {
+            "reputation_score": 800, "total_transactions": 4
+        })
+
+        x402resolve._reputation_cache.clear()
+        try:
+            with patch.object(x402resolve, "get_solana_client", return_value=solana):
+                first = asyncio.run(x402resolve.get_api_reputation("provider"))
+                first["reputation_score"] = -1
+                second = asyncio.run(x402resolve.get_api_reputation("provider"))
+                second["recommendation"] = "tampered"
+                third = asyncio.run(x402resolve.get_api_reputation("provider"))
+        finally:
+            x402resolve._reputation_cache.clear()
+
+        assert solana.get_api_reputation.await_count == 1
+        assert third["reputation_score"] == 800
+        assert third["recommendation"] == "reliable"
+
+
+class TestSolanaAccounts:
+    """Test decoding of on-chain escrow and reputation accounts."""
+
+    @pytest.fixture
+    def client(self):
+        from utils.solana_client import X402ResolveClient
+        return X402ResolveClient()
+
+    @staticmethod
+    def escrow_account(owner, status=0, quality_score=None, refund_percentage=None,
+                       discriminator=None):
+        """Pack an Escrow account the way Anchor lays it out"""
+        import struct
+        from solders.account import Account
+        from utils import solana_client
+
+        transaction_id = b"0123456789abcdef"
+        data = (
+            (discriminator or solana_client._ESCROW_DISCRIMINATOR)
+            + struct.pack("<32s32sQBqq", bytes(32), bytes(range(32)), 2_500_000,
+                          status, 1_700_000_000, 1_700_086_400)
+            + struct.pack("<I", len(transaction_id)) + transaction_id
+            + b"\xfe"
+        )
+        for value in (quality_score, refund_percentage):
+            data += b"\x00" if value is None else bytes([1, value])
+        return Account(lamports=1, data=data, owner=owner)
+
+    @staticmethod
+    def reputation_account(owner, score, entity=bytes(32)):
+        """Pack an EntityReputation account the way Anchor lays it out"""
+        import struct
+        from solders.account import Account
+        from utils import solana_client
+
+        data = solana_client._REPUTATION_DISCRIMINATOR + struct.pack(
+            "<32sB5QBHqqB", entity, 1, 10, 2, 1, 0, 1, 88, score, 0, 0, 255
+        )
+        return Account(lamports=1, data=data, owner=owner)
+
+    def test_escrow_status_decodes_fields(self, client):
+        """Escrow fields, status and optional scores are decoded."""
+        account = self.escrow_account(client.program_id, status=3,
+                                      quality_score=42, refund_percentage=60)
+
+        status = client._escrow_status("escrow", account)
+
+        assert status["status"] == "resolved"
+        assert status["amount_sol"] == 0.0025
+        assert status["quality_score"] == 42
+        assert status["refund_percentage"] == 60
+
+        status = client._escrow_status("escrow", self.escrow_account(client.program_id))
+        assert status["status"] == "active"
+        assert "quality_score" not in status
+
+    def test_escrow_status_rejects_other_accounts(self, client):
+        """Foreign, truncated or corrupt accounts raise ValueError."""
+        from solders.account import Account
+        from solders.pubkey import Pubkey
+
+        good = self.escrow_account(client.program_id)
+        bad_accounts = [
+            self.escrow_account(Pubkey.default()),
+            self.escrow_account(client.program_id, discriminator=bytes(8)),
+            self.escrow_account(client.program_id, status=7),
+            Account(lamports=1, data=bytes(good.data)[:40], owner=client.program_id),
+            Account(lamports=1, data=bytes(good.data)[:-1], owner=client.program_id),
+        ]
+
+        for account in bad_accounts:
+            with pytest.raises(ValueError):
+                client._escrow_status("escrow", account)
+
+    def test_escrow_status_batch_isolates_bad_accounts(self, client):
+        """A non-escrow account only fails its own batch entry."""
+        import asyncio
+        from solders.keypair import Keypair
+
+        addresses = [str(Keypair().pubkey()) for _ in range(3)]
+        accounts = [
+            self.escrow_account(client.program_id),
+            self.reputation_account(client.program_id, 800),
+            None,
+        ]
+
+        async def get_multiple_accounts(pubkeys):
+            return accounts
+
+        with patch.object(client, "_get_multiple_accounts", get_multiple_accounts):
+            results = asyncio.run(client.check_escrow_status_batch(addresses))
+
+        assert results[0]["status"] == "active"
+        assert results[1] == {
+            "escrow_address": addresses[1],
+            "error": f"Not an escrow account: {addresses[1]}"
+        }
+        assert "not found" in results[2]["error"]
+
+    def test_reputation_decodes_fields(self, client):
+        """Reputation counters and score are decoded."""
+        reputation = client._reputation(self.reputation_account(client.program_id, 650))
+
+        assert reputation["reputation_score"] == 650
+        assert reputation["total_transactions"] == 10
+        assert reputation["disputes_lost"] == 1
+        assert reputation["average_quality_provided"] == 88
+        assert client._reputation(None)["reputation_score"] == 0
+
+        with pytest.raises(ValueError):
+            client._reputation(self.escrow_account(client.program_id))
+
+
+class TestSolanaBatching:
+    """Test batched RPC lookups with the RPC transport mocked out."""
+
+    @pytest.fixture
+    def client(self):
+        from utils.solana_client import X402ResolveClient
+        return X402ResolveClient()
+
+    @staticmethod
+    def rpc_transport(handler):
+        import httpx
+        import json
+        return httpx.AsyncClient(transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, json=handler(json.loads(request.content)))
+        ))
+
+    def test_get_multiple_accounts_chunks_in_order(self, client):
+        """Lookups are split into chunks of 100 and reassembled in order."""
+        import asyncio
+        from types import SimpleNamespace
+        from solders.keypair import Keypair
+
+        pubkeys = [Keypair().pubkey() for _ in range(250)]
+        chunks = []
+
+        async def get_multiple_accounts(chunk):
+            chunks.append(len(chunk))
+            # Every third account is missing
+            return SimpleNamespace(value=[
+                None if pubkeys.index(key) % 3 == 0 else str(key) for key in chunk
+            ])
+
+        client.client.get_multiple_accounts = get_multiple_accounts
+        accounts = asyncio.run(client._get_multiple_accounts(pubkeys))
+
+        assert chunks == [100, 100, 50]
+        assert accounts == [
+            None if i % 3 == 0 else str(key) for i, key in enumerate(pubkeys)
+        ]
+
+    def test_get_api_reputations_keeps_provider_order(self, client):
+        """Reputations come back per provider, missing ones as new providers."""
+        import asyncio
+        from types import SimpleNamespace
+        from solders.keypair import Keypair
+        from solders.pubkey import Pubkey
+
+        providers = [str(Keypair().pubkey()) for _ in range(3)]
+        known = TestSolanaAccounts.reputation_account(client.program_id, 900)
+
+        async def get_multiple_accounts(pdas):
+            expected = [client._derive_reputation_pda(Pubkey.from_string(p))[0] for p in providers]
+            assert list(pdas) == expected
+            return SimpleNamespace(value=[None, known, None])
+
+        client.client.get_multiple_accounts = get_multiple_accounts
+        reputations = asyncio.run(client.get_api_reputations(providers))
+
+        assert [r["reputation_score"] for r in reputations] == [0, 900, 0]
+        assert "note" in reputations[0]
+
+    def test_list_reputations_filters_and_sorts(self, client):
+        """One filtered, sliced scan; min_score and ordering applied locally."""
+        import asyncio
+        from types import SimpleNamespace
+        from solders.keypair import Keypair
+        import base58
+        from solana.rpc.types import MemcmpOpts
+        from utils import solana_client
+
+        entities = [Keypair().pubkey() for _ in range(3)]
+        accounts = [
+            SimpleNamespace(
+                pubkey=Keypair().pubkey(),
+                account=SimpleNamespace(data=TestSolanaAccounts.reputation_account(
+                    client.program_id, score, bytes(entity)
+                ).data[8:8 + solana_client._REPUTATION_SUMMARY.size])
+            )
+            for entity, score in zip(entities, (600, 300, 900))
+        ]
+        calls = []
+
+        async def get_program_accounts(program_id, **kwargs):
+            calls.append((program_id, kwargs))
+            return SimpleNamespace(value=accounts)
+
+        client.client.get_program_accounts = get_program_accounts
+        reputations = asyncio.run(client.list_reputations(min_score=500))
+
+        assert len(calls) == 1
+        program_id, kwargs = calls[0]
+        assert program_id == client.program_id
+        assert kwargs["encoding"] == "base64"
+        assert kwargs["data_slice"].offset == solana_client._ANCHOR_DISCRIMINATOR_SIZE
+        assert kwargs["data_slice"].length == solana_client._REPUTATION_SUMMARY.size
+        size_filter, memcmp = kwargs["filters"]
+        assert size_filter == solana_client._REPUTATION_ACCOUNT_SIZE
+        assert isinstance(memcmp, MemcmpOpts) and memcmp.offset == 0
+        assert base58.b58decode(memcmp.bytes) == solana_client._REPUTATION_DISCRIMINATOR
+
+        assert [r["reputation_score"] for r in reputations] == [900, 600]
+        assert [r["entity"] for r in reputations] == [str(entities[2]), str(entities[0])]
+        assert reputations[0]["account"] == str(accounts[2].pubkey)
+        assert reputations[0]["entity_type"] == "provider"
+        assert reputations[0]["average_quality_provided"] == 88
+
+    def test_verify_payments_matches_responses_by_id(self, client):
+        """Out-of-order batch responses are matched to their hashes."""
+        import asyncio
+
+        def handler(batch):
+            responses = [
+                {"jsonrpc": "2.0", "id": call["id"],
+                 "result": {"slot": 1} if call["params"][0] != "missing" else None}
+                for call in batch
+            ]
+            responses.append({"jsonrpc": "2.0", "id": 99,
+                              "error": {"code": -32000, "message": "unused"}})
+            return list(reversed(responses))
+
+        client._http = self.rpc_transport(handler)
+        results = asyncio.run(client.verify_payments(["a", "missing", "b"]))
+
+        assert results[0]["verified"] and results[0]["transaction_hash"] == "a"
+        assert results[1] == {"verified": False, "error": "Transaction not found"}
+        assert results[2]["verified"] and results[2]["transaction_hash"] == "b"
+
+    def test_verify_payments_applies_batch_error(self, client):
+        """A single error object for a rejected batch fails every hash."""
+        import asyncio
+
+        client._http = self.rpc_transport(lambda batch: {
+            "jsonrpc": "2.0", "id": None,
+            "error": {"code": 429, "message": "Too many requests"}
+        })
+        results = asyncio.run(client.verify_payments(["a", "b"]))
+
+        assert [r["error"] for r in results] == ["Too many requests"] * 2
+        assert not any(r["verified"] for r in results)
+
 
 class TestDisputeWorkflow:
     """Test end-to-end dispute workflow."""
@@ -270,6 +800,143 @@ class TestDisputeWorkflow:
         assert result['signature'] is not None
 
 
+class TestRiskCache:
+    """Test caching of protocol risk assessments."""
+
+    @pytest.fixture
+    def risk(self, tmp_path):
+        from tools import risk
+
+        db = initialize_database(str(tmp_path / "risk.db"), seed=True)
+        risk.invalidate_risk_cache()
+        with patch.object(risk, "get_db", side_effect=lambda: db) as get_db:
+            yield risk, get_db
+        risk.invalidate_risk_cache()
+
+    def test_cached_result_is_a_copy(self, risk):
+        """Mutating a returned assessment doesn't alter later cache hits."""
+        risk, get_db = risk
+
+        first = risk.assess_protocol_risk("Curve", user_tier="enterprise")
+        first["recommendations"].append("tampered")
+        first["risk_score"] = -1
+        second = risk.assess_protocol_risk("Curve", user_tier="enterprise")
+
+        assert get_db.call_count == 1
+        assert second["risk_score"] != -1
+        assert "tampered" not in second["recommendations"]
+
+    def test_cache_expires_and_invalidates(self, risk, monkeypatch):
+        """Assessments are recomputed after the TTL or an invalidation."""
+        risk, get_db = risk
+
+        risk.assess_protocol_risk("Curve")
+        risk.invalidate_risk_cache()
+        risk.assess_protocol_risk("Curve")
+        assert get_db.call_count == 2
+
+        monkeypatch.setattr(risk, "RISK_CACHE_TTL_SECONDS", 0)
+        risk.assess_protocol_risk("Curve")
+        assert get_db.call_count == 3
+
+    def test_peer_stats_cache_is_capped(self, risk, monkeypatch):
+        """Peer statistics for many chains don't grow the cache unbounded."""
+        risk, get_db = risk
+        monkeypatch.setattr(risk, "PEER_STATS_CACHE_MAX_SIZE", 2)
+
+        with get_db().get_ro_connection() as conn:
+            for chain in ("Ethereum", "Solana", "BSC", "Arbitrum"):
+                peers = risk._get_peer_stats(conn, chain, 365)
+                assert isinstance(peers, tuple)
+
+        assert len(risk._peer_stats_cache) <= 2
+
+
+class TestRiskBatch:
+    """Test batch risk scoring against single-protocol assessments."""
+
+    PROTOCOLS = ["Curve", "curve", "Euler", "Aave", "Nonexistent"]
+
+    @pytest.fixture(params=["numba", "numpy", "python"])
+    def risk(self, request, tmp_path, monkeypatch):
+        import time
+        from tools import risk
+
+        if request.param == "numba" and risk.numba is None:
+            pytest.skip("numba not installed")
+        if request.param == "numpy" and risk.np is None:
+            pytest.skip("numpy not installed")
+        if request.param != "numba":
+            monkeypatch.setattr(risk, "numba", None)
+        if request.param == "python":
+            monkeypatch.setattr(risk, "np", None)
+
+        # Offsets avoid whole days so both paths agree on days since the last exploit
+        now = int(time.time())
+        day = 86400
+        db = Database(str(tmp_path / "batch.db"))
+        db.execute_with_retry("""
+            INSERT INTO exploits (protocol, chain, tx_hash, amount_usd, timestamp)
+            VALUES ('Curve', 'Ethereum', '0x1', 2e7, ?),
+                   ('Curve Finance', 'Ethereum', '0x2', 5e5, ?),
+                   ('Curve', 'BSC', '0x3', 3e6, ?),
+                   ('Euler Finance', 'Ethereum', '0x4', 2e8, ?),
+                   ('Aave', 'Arbitrum', '0x5', 5e3, ?)
+        """, (
+            now - 3 * day - day // 2,
+            now - 45 * day - day // 2,
+            now - 20 * day - day // 2,
+            now - 120 * day - day // 2,
+            now - 200 * day - day // 2
+        ))
+
+        risk.invalidate_risk_cache()
+        with patch.object(risk, "get_db", side_effect=lambda: db):
+            yield risk
+        risk.invalidate_risk_cache()
+
+    @pytest.mark.parametrize("chain", [None, "Ethereum"])
+    def test_batch_matches_single(self, risk, chain):
+        """Every backend scores each protocol as assess_protocol_risk does."""
+        batch = risk.assess_protocols_risk(self.PROTOCOLS, chain=chain, time_window_days=365)
+
+        assert [r["protocol"] for r in batch] == self.PROTOCOLS
+        for result in batch:
+            single = risk.assess_protocol_risk(
+                result["protocol"], chain=chain, time_window_days=365
+            )
+            assert result["risk_score"] == single["risk_score"], result["protocol"]
+            assert result["risk_level"] == single["risk_level"]
+            assert isinstance(result["risk_score"], int)
+
+        scores = {r["protocol"]: r["risk_score"] for r in batch}
+        assert scores["Nonexistent"] == 0
+        assert scores["Curve"] > 0
+        assert scores["curve"] == scores["Curve"]
+
+
+class TestExploitsCache:
+    """Test caching of exploited protocol lookups."""
+
+    def test_exploits_cache_returns_copies(self, tmp_path):
+        """Mutating cached exploit records doesn't leak to other callers."""
+        from tools import monitoring
+
+        db = initialize_database(str(tmp_path / "exploits.db"), seed=True)
+        monitoring.invalidate_exploits_cache()
+        with patch.object(monitoring, "get_db", return_value=db):
+            first = monitoring.get_exploited_protocols(3650)
+            first[0]["protocol"] = "tampered"
+            first.clear()
+            second = monitoring.get_exploited_protocols(3650)
+            third = monitoring.get_exploited_protocols(3650)
+        monitoring.invalidate_exploits_cache()
+
+        assert second and second == third
+        assert second is not third
+        assert all(exploit["protocol"] != "tampered" for exploit in second)
+
+
 class TestErrorHandling:
     """Test error handling in MCP tools."""
 
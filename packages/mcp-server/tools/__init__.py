@@ -5,10 +5,11 @@ Tool implementations for the KAMIYO MCP server
 
 from .monitoring import check_wallet_interactions
 from .exploits import search_exploits
-from .risk import assess_protocol_risk
+from .risk import assess_protocol_risk, assess_protocols_risk
 
 __all__ = [
     "check_wallet_interactions",
     "search_exploits",
-    "assess_protocol_risk"
+    "assess_protocol_risk",
+    "assess_protocols_risk"
 ]
@@ -6,14 +6,9 @@ This tool allows MCP-compatible applications to search crypto exploit intelligen
 with access levels determined by the user's subscription tier.
 """
 
-import sys
-import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional, List, Dict, Any
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-
 from database import get_db
 import logging
 
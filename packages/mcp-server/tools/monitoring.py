@@ -6,23 +6,56 @@ This tool allows users to check if a wallet address has interactions with
 protocols that have been exploited, providing risk assessment.
 """
 
-import sys
-import os
 import re
+import time
+import asyncio
+import bisect
 import logging
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Callable, Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
-from decimal import Decimal
-
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from database import get_db
 
 logger = logging.getLogger(__name__)
 
+# Address formats, compiled once at import
+_EVM_RE = re.compile(r'^0x[a-fA-F0-9]{40}$')
+_SOL_RE = re.compile(r'^[1-9A-HJ-NP-Za-km-z]{32,44}$')
+
+
+def _is_evm_address(address: str) -> bool:
+    # 0x prefix and 40 hex characters; the length check rejects most
+    # malformed input without entering the regex engine
+    return len(address) == 42 and _EVM_RE.match(address) is not None
+
+
+def _is_solana_address(address: str) -> bool:
+    # Basic Solana address validation (base58, typically 32-44 chars)
+    return _SOL_RE.match(address) is not None
+
+
+_EVM_VALIDATOR = (
+    _is_evm_address,
+    "Invalid EVM address format. Expected 0x followed by 40 hex characters."
+)
+_SOLANA_VALIDATOR = (
+    _is_solana_address,
+    "Invalid Solana address format. Expected base58 encoded address (32-44 characters)."
+)
+
+# Address validator and error message per chain
+_VALIDATORS: Dict[str, Tuple[Callable[[str], bool], str]] = {
+    "ethereum": _EVM_VALIDATOR,
+    "bsc": _EVM_VALIDATOR,
+    "polygon": _EVM_VALIDATOR,
+    "arbitrum": _EVM_VALIDATOR,
+    "base": _EVM_VALIDATOR,
+    "solana": _SOLANA_VALIDATOR,
+}
+
 # Supported chains
-SUPPORTED_CHAINS = ["ethereum", "bsc", "polygon", "arbitrum", "base", "solana"]
+SUPPORTED_CHAINS = list(_VALIDATORS)
 
 # Risk levels
 RISK_LEVELS = {
@@ -33,6 +66,74 @@ RISK_LEVELS = {
     "critical": {"threshold": 10, "description": "Critical exposure detected, urgent action required"}
 }
 
+# Risk levels ordered by threshold, for bisecting a score into its level
+_RISK_THRESHOLDS = sorted((v["threshold"], k) for k, v in RISK_LEVELS.items())
+_THRESHOLD_VALUES = [threshold for threshold, _ in _RISK_THRESHOLDS]
+_RISK_DESCRIPTIONS = {level: info["description"] for level, info in RISK_LEVELS.items()}
+
+# Recommendations per risk level
+_RECOMMENDATIONS = {
+    "safe": (
+        "No risky interactions detected. Continue monitoring for new exploits.",
+    ),
+    "low": (
+        "Monitor your positions with the identified protocols.",
+        "Consider setting up alerts for these protocols.",
+    ),
+    "medium": (
+        "Review all active positions with exploited protocols.",
+        "Consider reducing exposure to affected protocols.",
+        "Enable real-time alerts for wallet activity.",
+    ),
+    "high": (
+        "URGENT: Review all positions immediately.",
+        "Consider withdrawing funds from affected protocols.",
+        "Check for approval transactions that may be exploitable.",
+        "Monitor wallet for unauthorized transactions.",
+    ),
+    "critical": (
+        "CRITICAL: Immediate action required!",
+        "Withdraw all funds from affected protocols immediately.",
+        "Revoke all token approvals for exploited protocols.",
+        "Consider moving funds to a new wallet address.",
+        "Enable multi-signature protection for large holdings.",
+    ),
+}
+
+# Exploit data changes slowly, so query results are shared across wallet
+# checks for a short window, keyed by (lookback_days, limit). Every caller
+# gets its own copies of the records.
+EXPLOITS_CACHE_TTL_SECONDS = 60
+_exploits_cache: Dict[Tuple[int, Optional[int]], Tuple[float, Tuple[Dict[str, Any], ...]]] = {}
+
+# Number of most recent exploited protocols a wallet is checked against
+MAX_PROTOCOLS_CHECKED = 5
+
+# Fixed statement text (LIMIT -1 means no limit) so pooled connections
+# reuse the prepared statement from sqlite3's per-connection cache
+_EXPLOITS_SQL = """
+    SELECT
+        protocol,
+        chain,
+        amount_usd,
+        timestamp,
+        tx_hash,
+        category,
+        description
+    FROM exploits
+    WHERE timestamp >= CAST(strftime('%s', 'now', ? || ' days') AS INTEGER)
+    AND is_test = 0
+    ORDER BY timestamp DESC
+    LIMIT ?
+"""
+_exploits_cache_lock = threading.Lock()
+
+
+def invalidate_exploits_cache() -> None:
+    """Drop cached exploit query results (call after inserting exploits)"""
+    with _exploits_cache_lock:
+        _exploits_cache.clear()
+
 
 def validate_wallet_address(address: str, chain: str = "ethereum") -> Dict[str, Any]:
     """
@@ -48,32 +149,15 @@ def validate_wallet_address(address: str, chain: str = "ethereum") -> Dict[str,
     if not address:
         return {"is_valid": False, "error": "Wallet address is required"}
 
-    # Remove whitespace
-    address = address.strip()
-
-    # EVM chains (Ethereum, BSC, Polygon, Arbitrum, Base)
-    if chain in ["ethereum", "bsc", "polygon", "arbitrum", "base"]:
-        # Check for 0x prefix and 40 hex characters
-        if not re.match(r'^0x[a-fA-F0-9]{40}$', address):
-            return {
-                "is_valid": False,
-                "error": f"Invalid EVM address format. Expected 0x followed by 40 hex characters."
-            }
-        return {"is_valid": True}
-
-    # Solana addresses (base58, 32-44 characters)
-    elif chain == "solana":
-        # Basic Solana address validation (base58, typically 32-44 chars)
-        if not re.match(r'^[1-9A-HJ-NP-Za-km-z]{32,44}$', address):
-            return {
-                "is_valid": False,
-                "error": "Invalid Solana address format. Expected base58 encoded address (32-44 characters)."
-            }
-        return {"is_valid": True}
-
-    else:
+    validator = _VALIDATORS.get(chain)
+    if validator is None:
         return {"is_valid": False, "error": f"Unsupported chain: {chain}"}
 
+    is_valid, error = validator
+    if not is_valid(address.strip()):
+        return {"is_valid": False, "error": error}
+    return {"is_valid": True}
+
 
 def calculate_risk_score(interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
     """
@@ -89,19 +173,19 @@ def calculate_risk_score(interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         return {
             "risk_level": "safe",
             "score": 0,
-            "description": RISK_LEVELS["safe"]["description"],
-            "recommendations": ["No risky interactions detected. Continue monitoring for new exploits."]
+            "description": _RISK_DESCRIPTIONS["safe"],
+            "recommendations": list(_RECOMMENDATIONS["safe"])
         }
 
     # Calculate score based on:
     # - Number of interactions (1 point each)
     # - Amount at risk (0.5 points per $10k)
-    # - Recent interactions (2x multiplier if within 30 days)
+    # - Recent interactions (1.2x multiplier each if within 30 days)
 
-    score = 0
-    total_at_risk = Decimal(0)
+    score = 0.0
+    total_at_risk = 0.0
     recent_count = 0
-    thirty_days_ago = datetime.now() - timedelta(days=30)
+    cutoff_ts = time.time() - 30 * 86400
 
     for interaction in interactions:
         # Base score for interaction
@@ -110,48 +194,30 @@ def calculate_risk_score(interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
         # Add score for amount
         amount = interaction.get("amount_usd", 0)
         if amount:
-            total_at_risk += Decimal(str(amount))
-            score += float(amount) / 10000 * 0.5  # 0.5 points per $10k
+            amount = float(amount)
+            total_at_risk += amount
+            score += amount / 10000 * 0.5  # 0.5 points per $10k
 
-        # Check if recent
-        if interaction.get("last_interaction"):
+        # Check if recent; epoch seconds avoid re-parsing the ISO string
+        last_ts = interaction.get("last_interaction_ts")
+        if last_ts is None and interaction.get("last_interaction"):
             try:
-                last_interaction = datetime.fromisoformat(interaction["last_interaction"])
-                if last_interaction > thirty_days_ago:
-                    recent_count += 1
-                    score *= 1.2  # 20% multiplier for recent interactions
+                last_ts = datetime.fromisoformat(interaction["last_interaction"]).timestamp()
             except (ValueError, TypeError):
                 pass
+        if last_ts is not None and last_ts > cutoff_ts:
+            recent_count += 1
+
+    # 20% multiplier per recent interaction, applied once so the score no
+    # longer depends on the order interactions are listed in
+    score *= 1.2 ** recent_count
 
     # Determine risk level
-    risk_level = "safe"
-    for level in ["low", "medium", "high", "critical"]:
-        if score >= RISK_LEVELS[level]["threshold"]:
-            risk_level = level
+    idx = bisect.bisect_right(_THRESHOLD_VALUES, score) - 1
+    risk_level = _RISK_THRESHOLDS[idx][1]
 
     # Generate recommendations
-    recommendations = []
-
-    if risk_level == "safe":
-        recommendations.append("No risky interactions detected. Continue monitoring for new exploits.")
-    elif risk_level == "low":
-        recommendations.append("Monitor your positions with the identified protocols.")
-        recommendations.append("Consider setting up alerts for these protocols.")
-    elif risk_level == "medium":
-        recommendations.append("Review all active positions with exploited protocols.")
-        recommendations.append("Consider reducing exposure to affected protocols.")
-        recommendations.append("Enable real-time alerts for wallet activity.")
-    elif risk_level == "high":
-        recommendations.append("URGENT: Review all positions immediately.")
-        recommendations.append("Consider withdrawing funds from affected protocols.")
-        recommendations.append("Check for approval transactions that may be exploitable.")
-        recommendations.append("Monitor wallet for unauthorized transactions.")
-    else:  # critical
-        recommendations.append("CRITICAL: Immediate action required!")
-        recommendations.append("Withdraw all funds from affected protocols immediately.")
-        recommendations.append("Revoke all token approvals for exploited protocols.")
-        recommendations.append("Consider moving funds to a new wallet address.")
-        recommendations.append("Enable multi-signature protection for large holdings.")
+    recommendations = list(_RECOMMENDATIONS[risk_level])
 
     if recent_count > 0:
         recommendations.append(f"Note: {recent_count} interaction(s) occurred within the last 30 days.")
@@ -159,74 +225,63 @@ def calculate_risk_score(interactions: List[Dict[str, Any]]) -> Dict[str, Any]:
     return {
         "risk_level": risk_level,
         "score": round(score, 2),
-        "total_at_risk_usd": float(total_at_risk),
-        "description": RISK_LEVELS[risk_level]["description"],
+        "total_at_risk_usd": total_at_risk,
+        "description": _RISK_DESCRIPTIONS[risk_level],
         "recommendations": recommendations
     }
 
 
-def get_exploited_protocols(lookback_days: int = 90) -> List[Dict[str, Any]]:
+def get_exploited_protocols(
+    lookback_days: int = 90,
+    limit: Optional[int] = None
+) -> List[Dict[str, Any]]:
     """
     Get list of exploited protocols from database
 
     Args:
         lookback_days: How far back to check for exploits
+        limit: Maximum number of most recent exploits to return (default: all)
 
     Returns:
         List of exploited protocol records
     """
+    cache_key = (lookback_days, limit)
+    with _exploits_cache_lock:
+        cached = _exploits_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < EXPLOITS_CACHE_TTL_SECONDS:
+        return [dict(exploit) for exploit in cached[1]]
+
     try:
         db = get_db()
 
-        # Calculate cutoff date
-        cutoff_date = datetime.now() - timedelta(days=lookback_days)
-
-        # Query exploits from database
+        # Query exploits from database; SQLite computes the cutoff
         with db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute("""
-                SELECT
-                    protocol,
-                    chain,
-                    amount_usd,
-                    timestamp,
-                    tx_hash,
-                    category,
-                    description
-                FROM exploits
-                WHERE timestamp >= ?
-                AND LOWER(protocol) NOT LIKE '%test%'
-                AND LOWER(COALESCE(category, '')) NOT LIKE '%test%'
-                ORDER BY timestamp DESC
-            """, (cutoff_date,))
-
-            rows = cursor.fetchall()
-
-            # Convert to list of dicts
-            exploits = []
-            for row in rows:
-                exploits.append({
-                    "protocol": row["protocol"],
-                    "chain": row["chain"],
-                    "amount_usd": row["amount_usd"],
-                    "timestamp": row["timestamp"],
-                    "tx_hash": row["tx_hash"],
-                    "category": row["category"],
-                    "description": row["description"]
-                })
-
-            logger.info(f"Found {len(exploits)} exploits in last {lookback_days} days")
+            cursor.execute(_EXPLOITS_SQL, (-lookback_days, -1 if limit is None else limit))
+
+            # Rows come back as sqlite3.Row keyed by the selected columns;
+            # iterate the cursor so no intermediate row list is built
+            exploits = [dict(row) for row in cursor]
+
+            logger.info("Found %s exploits in last %s days", len(exploits), lookback_days)
+
+            # Errors fall through to the handler below and are not cached
+            with _exploits_cache_lock:
+                _exploits_cache[cache_key] = (
+                    time.monotonic(), tuple(dict(exploit) for exploit in exploits)
+                )
             return exploits
 
     except Exception as e:
-        logger.error(f"Error fetching exploited protocols: {e}")
+        logger.error("Error fetching exploited protocols: %s", e)
         return []
 
 
 def simulate_wallet_interactions(
     wallet_address: str,
     chain: str,
-    exploited_protocols: List[Dict[str, Any]]
+    exploited_protocols: List[Dict[str, Any]],
+    now: Optional[datetime] = None
 ) -> List[Dict[str, Any]]:
     """
     Simulate checking wallet interactions with exploited protocols
@@ -242,34 +297,47 @@ def simulate_wallet_interactions(
     Args:
         wallet_address: Wallet address to check
         chain: Blockchain to scan
-        exploited_protocols: List of exploited protocols
+        exploited_protocols: Exploited protocols to check (most recent first)
+        now: Reference time for simulated interaction dates (default: now)
 
     Returns:
         List of interaction records
     """
     interactions = []
+    now = now or datetime.now()
 
     # Simulate finding interactions (in production, would query blockchain)
     # For demo purposes, randomly match some protocols based on wallet hash
-    wallet_hash = int(wallet_address[-8:], 16) if chain != "solana" else sum(ord(c) for c in wallet_address[-8:])
-
-    for i, protocol in enumerate(exploited_protocols[:5]):  # Check up to 5 protocols
-        # Simulate: 30% chance of interaction based on wallet hash
-        if (wallet_hash + i) % 10 < 3:
-            # Simulate interaction data
-            interaction = {
-                "protocol": protocol["protocol"],
-                "chain": protocol["chain"],
-                "exploit_date": protocol["timestamp"],
-                "exploit_amount_usd": protocol["amount_usd"],
-                "wallet_interaction_count": (wallet_hash + i) % 5 + 1,
-                "last_interaction": (datetime.now() - timedelta(days=(wallet_hash + i) % 90)).isoformat(),
-                "amount_usd": float(protocol["amount_usd"] or 0) * 0.001 if protocol["amount_usd"] else None,  # Simulate 0.1% exposure
-                "interaction_type": "token_transfer",
-                "status": "at_risk" if i < 2 else "monitoring",
-                "details": f"Found {(wallet_hash + i) % 5 + 1} transaction(s) with {protocol['protocol']}"
-            }
-            interactions.append(interaction)
+    tail = wallet_address[-8:]
+    wallet_hash = int(tail, 16) if chain != "solana" else int.from_bytes(tail.encode("ascii"), "little")
+
+    # Match all candidates in one pass (in production, one batched provider
+    # call per wallet) and only build records for the hits
+    # Simulate: 30% chance of interaction based on wallet hash
+    matches = [
+        (i, protocol)
+        for i, protocol in enumerate(exploited_protocols)
+        if (wallet_hash + i) % 10 < 3
+    ]
+
+    for i, protocol in matches:
+        # Simulate interaction data
+        tx_count = (wallet_hash + i) % 5 + 1
+        exploit_amount = protocol["amount_usd"]
+        last_interaction = now - timedelta(days=(wallet_hash + i) % 90)
+        interactions.append({
+            "protocol": protocol["protocol"],
+            "chain": protocol["chain"],
+            "exploit_date": protocol["timestamp"],
+            "exploit_amount_usd": exploit_amount,
+            "wallet_interaction_count": tx_count,
+            "last_interaction": last_interaction.isoformat(),
+            "last_interaction_ts": int(last_interaction.timestamp()),
+            "amount_usd": float(exploit_amount) * 0.001 if exploit_amount else None,  # Simulate 0.1% exposure
+            "interaction_type": "token_transfer",
+            "status": "at_risk" if i < 2 else "monitoring",
+            "details": f"Found {tx_count} transaction(s) with {protocol['protocol']}"
+        })
 
     return interactions
 
@@ -327,7 +395,7 @@ async def check_wallet_interactions(
 
     # Validate chain
     chain = chain.lower()
-    if chain not in SUPPORTED_CHAINS:
+    if chain not in _VALIDATORS:
         return {
             "error": "invalid_chain",
             "message": f"Unsupported chain: {chain}",
@@ -354,15 +422,26 @@ async def check_wallet_interactions(
 
     # ========== FETCH EXPLOITED PROTOCOLS ==========
 
-    logger.info(f"Checking wallet {wallet_address} on {chain} (lookback: {lookback_days} days)")
+    logger.info(
+        "Checking wallet %s on %s (lookback: %s days)",
+        wallet_address, chain, lookback_days
+    )
+
+    # One timestamp for the whole scan
+    now = datetime.now()
+    scan_date = now.isoformat()
 
-    exploited_protocols = get_exploited_protocols(lookback_days)
+    # Only the most recent protocols are checked, so let SQLite stop there.
+    # The query runs in a worker thread to keep the event loop free
+    exploited_protocols = await asyncio.to_thread(
+        get_exploited_protocols, lookback_days, limit=MAX_PROTOCOLS_CHECKED
+    )
 
     if not exploited_protocols:
         return {
             "wallet_address": wallet_address,
             "chain": chain,
-            "scan_date": datetime.now().isoformat(),
+            "scan_date": scan_date,
             "lookback_days": lookback_days,
             "exploits_checked": 0,
             "interactions_found": [],
@@ -379,7 +458,7 @@ async def check_wallet_interactions(
 
     # In production, this would query blockchain data providers
     # For now, use simulated data
-    interactions = simulate_wallet_interactions(wallet_address, chain, exploited_protocols)
+    interactions = simulate_wallet_interactions(wallet_address, chain, exploited_protocols, now=now)
 
     # ========== CALCULATE RISK SCORE ==========
 
@@ -390,7 +469,7 @@ async def check_wallet_interactions(
     return {
         "wallet_address": wallet_address,
         "chain": chain,
-        "scan_date": datetime.now().isoformat(),
+        "scan_date": scan_date,
         "lookback_days": lookback_days,
         "exploits_checked": len(exploited_protocols),
         "interactions_found": interactions,
@@ -407,8 +486,6 @@ async def check_wallet_interactions(
 
 # For testing
 if __name__ == "__main__":
-    import asyncio
-
     # Test with Team tier user
     async def test():
         result = await check_wallet_interactions(
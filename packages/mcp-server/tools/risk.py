@@ -5,19 +5,186 @@ Provides protocol risk assessment functionality with tier-based detail levels.
 Analyzes exploit history to calculate risk scores and provide recommendations.
 """
 
-import sys
-import os
-from typing import Optional, Dict, Any, List
-from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Iterable, List, Sequence, Tuple
+from datetime import datetime, timezone
+import bisect
+import copy
+import functools
+import heapq
 import logging
+import sqlite3
+import threading
+import time
 
-# Add parent directory to path for imports
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+try:
+    import numpy as np
+except ImportError:  # Batch scoring falls back to per-protocol scoring
+    np = None
 
-from database import get_db
+try:
+    import numba
+except ImportError:  # Batch scoring uses numpy (or pure Python) instead
+    numba = None
+
+from database import Database, get_db
 
 logger = logging.getLogger(__name__)
 
+# Step-function lookup tables for the risk score factors. Each factor is
+# scores[bisect(thresholds, value)]; see _calculate_risk_score for meaning.
+_FREQUENCY_THRESH = (1, 2, 3, 5)                  # exploit count, >=
+_FREQUENCY_SCORE = (0, 10, 20, 30, 40)
+_SEVERITY_THRESH = (1e4, 1e5, 1e6, 1e7, 5e7)      # average loss USD, >=
+_SEVERITY_SCORE = (5, 10, 15, 20, 25, 30)
+_RECENCY_THRESH = (7, 30, 90, 180)                # days since last, <=
+_RECENCY_SCORE = (20, 15, 10, 5, 2)
+_MATURITY_THRESH = (30, 90, 180)                  # span in days, >=
+_MATURITY_SCORE = (3, 5, 7, 10)
+
+# Risk level and audit priority by total score: <30, 30-59, 60-84, 85+
+_RISK_CUTS = (30, 60, 85)
+_RISK_LEVELS = ("low", "medium", "high", "critical")
+_AUDIT_LEVELS = ("low_priority", "medium_priority", "high_priority", "critical_priority")
+
+# Clients tend to re-ask about the same protocol within seconds, so whole
+# assessments are shared for a short window, keyed by
+# (protocol_name, chain, time_window_days, user_tier)
+RISK_CACHE_TTL_SECONDS = 60
+RISK_CACHE_MAX_SIZE = 2048
+_risk_cache: Dict[Tuple[str, Optional[str], int, str], Tuple[float, Dict[str, Any]]] = {}
+
+# Peer statistics do not depend on the protocol being assessed, only on
+# (chain, time_window_days); the percentile is computed per request. Rows
+# are kept in a tuple so every caller can share them safely.
+PEER_STATS_CACHE_MAX_SIZE = 256
+_peer_stats_cache: Dict[Tuple[Optional[str], int], Tuple[float, Tuple[sqlite3.Row, ...]]] = {}
+_risk_cache_lock = threading.Lock()
+
+
+# Recommendations per risk level; only the first names the protocol ({p})
+_RECS_BY_LEVEL = {
+    "critical": (
+        "URGENT: Immediate security audit required for {p}",
+        "Consider pausing protocol interactions until vulnerabilities are addressed",
+        "Review all smart contract permissions and admin keys",
+        "Implement circuit breakers and emergency pause mechanisms if not present",
+        "Conduct comprehensive code review with focus on identified vulnerability patterns",
+    ),
+    "high": (
+        "High priority: Schedule comprehensive security audit for {p}",
+        "Review and strengthen access controls and multi-sig requirements",
+        "Implement monitoring and alerting for suspicious activity",
+        "Consider purchasing additional exploit insurance coverage",
+        "Establish incident response plan and test it regularly",
+    ),
+    "medium": (
+        "Moderate risk: Plan routine security assessment for {p}",
+        "Monitor protocol closely for unusual activity",
+        "Review recent exploit patterns to identify common vulnerabilities",
+        "Ensure security best practices are followed in all deployments",
+        "Stay informed about similar exploits in the ecosystem",
+    ),
+    "low": (
+        "Low risk: Maintain current security practices for {p}",
+        "Continue regular security monitoring and updates",
+        "Participate in bug bounty programs to identify issues proactively",
+        "Keep dependencies and libraries up to date",
+    ),
+}
+
+# Recommendations per exploits.category_flags bit, in output order
+_CATEGORY_RECS = (
+    (Database.CATEGORY_FLAGS["flash_loan"],
+     "Flash loan attacks detected: Implement flash loan protection mechanisms"),
+    (Database.CATEGORY_FLAGS["reentrancy"],
+     "Reentrancy vulnerabilities found: Review and fix reentrancy guards"),
+    (Database.CATEGORY_FLAGS["oracle"],
+     " Oracle manipulation detected: Use multiple oracle sources and price sanity checks"),
+    (Database.CATEGORY_FLAGS["access_control"],
+     " Access control issues: Implement robust multi-sig and timelock mechanisms"),
+)
+
+# SQLite has no bitwise OR aggregate, so OR together the per-bit maxima
+_CATEGORY_FLAGS_AGG = "COALESCE({}, 0) as category_flags".format(
+    " | ".join(f"MAX(category_flags & {flag})" for flag, _ in _CATEGORY_RECS)
+)
+
+# Per-protocol exploit filter; see _make_stmts. The window start is
+# computed by SQLite from a bound day offset (-time_window_days), as epoch
+# seconds to match the timestamp column.
+_EXPLOIT_FILTER = """
+    FROM exploits
+    WHERE protocol_lc LIKE ?
+    AND timestamp >= CAST(strftime('%s', 'now', ? || ' days') AS INTEGER)
+    AND is_test = 0
+"""
+
+
+@functools.lru_cache(maxsize=8)
+def _make_stmts(user_tier: str, with_chain: bool) -> Tuple[str, Optional[str]]:
+    """
+    Build the per-protocol SQL for one request shape.
+
+    Each tier selects only what its response uses. The text is built once
+    per shape, so pooled connections also reuse the compiled statements
+    from sqlite3's statement cache.
+
+    Returns (stats_sql, recent_sql); recent_sql is None for personal tier.
+    """
+    where = _EXPLOIT_FILTER + ("    AND chain = ?\n" if with_chain else "")
+
+    columns = [
+        "COUNT(*) as exploit_count",
+        "COALESCE(AVG(amount_usd), 0) as avg_loss",
+        "CAST(julianday('now') - julianday(MAX(timestamp), 'unixepoch') AS INTEGER)"
+        " as days_since_last",
+        "CAST(julianday(MAX(timestamp), 'unixepoch')"
+        " - julianday(MIN(timestamp), 'unixepoch') AS INTEGER) as span_days",
+    ]
+    recent_sql = None
+
+    if user_tier in ("team", "enterprise"):
+        columns += [
+            "COALESCE(SUM(amount_usd), 0) as total_loss",
+            "date(MAX(timestamp), 'unixepoch') as last_exploit_date",
+        ]
+        recent_sql = (
+            "SELECT strftime('%Y-%m-%dT%H:%M:%SZ', timestamp, 'unixepoch') as date,"
+            " chain, amount_usd, source_url, category,"
+            " SUBSTR(description, 1, 200) as description"
+            + where + "ORDER BY timestamp DESC LIMIT 5"
+        )
+
+    if user_tier == "enterprise":
+        columns.append(_CATEGORY_FLAGS_AGG)
+
+    stats_sql = "SELECT " + ", ".join(columns) + where
+    return stats_sql, recent_sql
+
+
+@functools.lru_cache(maxsize=2)
+def _make_peer_sql(with_chain: bool) -> str:
+    """Build the peer statistics SQL, with or without the chain filter."""
+    return (
+        """
+        SELECT
+            protocol,
+            SUM(exploit_count) as exploit_count,
+            SUM(total_loss) as total_loss
+        FROM protocol_stats
+        WHERE day >= date('now', ? || ' days')
+        """
+        + ("AND chain = ? " if with_chain else "")
+        + "GROUP BY protocol ORDER BY exploit_count DESC LIMIT 20"
+    )
+
+
+def invalidate_risk_cache() -> None:
+    """Drop cached assessments and peer statistics (call after inserting exploits)"""
+    with _risk_cache_lock:
+        _risk_cache.clear()
+        _peer_stats_cache.clear()
+
 
 def assess_protocol_risk(
     protocol_name: str,
@@ -139,6 +306,13 @@ def assess_protocol_risk(
     if user_tier not in ["personal", "team", "enterprise"]:
         raise ValueError("user_tier must be one of: personal, team, enterprise")
 
+    cache_key = (protocol_name, chain, time_window_days, user_tier)
+    with _risk_cache_lock:
+        cached = _risk_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < RISK_CACHE_TTL_SECONDS:
+        # Hand out a copy so callers can't alter the cached assessment
+        return copy.deepcopy(cached[1])
+
     # Normalize protocol name for case-insensitive matching
     protocol_name_lower = protocol_name.lower()
 
@@ -146,41 +320,41 @@ def assess_protocol_risk(
         # Get database instance
         db = get_db()
 
-        # Calculate time window
-        since = datetime.now() - timedelta(days=time_window_days)
-
-        # Build query to fetch exploits for this protocol
-        query = """
-            SELECT
-                id, tx_hash, chain, protocol, amount_usd, timestamp,
-                source, source_url, category, description, recovery_status
-            FROM exploits
-            WHERE LOWER(protocol) LIKE ?
-            AND timestamp >= ?
-            AND LOWER(protocol) NOT LIKE '%test%'
-            AND LOWER(COALESCE(category, '')) NOT LIKE '%test%'
-        """
-        params = [f"%{protocol_name_lower}%", since]
+        params = [f"%{protocol_name_lower}%", -time_window_days]
 
         # Add chain filter if specified
         if chain:
-            query += " AND chain = ?"
             params.append(chain)
 
-        query += " ORDER BY timestamp DESC"
+        stats_sql, recent_sql = _make_stmts(user_tier, bool(chain))
 
-        # Execute query
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            exploits = [dict(row) for row in rows]
+        # Execute queries; enterprise peer comparison reuses this connection
+        with db.get_ro_connection() as conn:
+            # Scoring only needs aggregates, so no exploit rows reach Python
+            stats = conn.execute(stats_sql, params).fetchone()
 
-        # Calculate risk score
-        risk_score, risk_factors = _calculate_risk_score(
-            exploits=exploits,
-            time_window_days=time_window_days
-        )
+            # Calculate risk score
+            risk_score, risk_factors = _calculate_risk_score(
+                exploit_count=stats["exploit_count"],
+                avg_loss=stats["avg_loss"],
+                days_since_last=stats["days_since_last"],
+                span_days=stats["span_days"]
+            )
+
+            # Rows are formatted straight off the cursor (at most 5)
+            recent_exploits = []
+            if recent_sql:
+                recent_exploits = _format_recent_exploits(conn.execute(recent_sql, params))
+
+            peer_comparison = None
+            if user_tier == "enterprise":
+                peer_comparison = _compare_to_peers(
+                    conn=conn,
+                    protocol_name=protocol_name,
+                    chain=chain,
+                    time_window_days=time_window_days,
+                    current_risk_score=risk_score
+                )
 
         # Determine risk level
         risk_level = _get_risk_level(risk_score)
@@ -192,26 +366,16 @@ def assess_protocol_risk(
             "risk_score": risk_score,
             "risk_level": risk_level,
             "analysis_period_days": time_window_days,
-            "assessed_at": datetime.now().isoformat() + "Z"
+            "assessed_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
         }
 
         # Add team tier features
         if user_tier in ["team", "enterprise"]:
-            total_loss = sum(e.get("amount_usd", 0) for e in exploits)
-            last_exploit_date = exploits[0]["timestamp"] if exploits else None
-
-            # Format last exploit date
-            if last_exploit_date:
-                if isinstance(last_exploit_date, str):
-                    last_exploit_date = datetime.fromisoformat(last_exploit_date.replace('Z', '+00:00')).date().isoformat()
-                else:
-                    last_exploit_date = last_exploit_date.date().isoformat()
-
             result.update({
-                "exploit_count": len(exploits),
-                "total_loss_usd": round(total_loss, 2),
-                "last_exploit_date": last_exploit_date,
-                "recent_exploits": _format_recent_exploits(exploits[:5])  # Top 5 recent
+                "exploit_count": stats["exploit_count"],
+                "total_loss_usd": round(stats["total_loss"], 2),
+                "last_exploit_date": stats["last_exploit_date"],
+                "recent_exploits": recent_exploits
             })
 
         # Add enterprise tier features
@@ -221,130 +385,165 @@ def assess_protocol_risk(
                 "recommendations": _generate_recommendations(
                     risk_score=risk_score,
                     risk_level=risk_level,
-                    exploits=exploits,
+                    category_flags=stats["category_flags"],
                     protocol_name=protocol_name
                 ),
-                "audit_status": _assess_audit_status(risk_score, exploits),
-                "comparison_to_peers": _compare_to_peers(
-                    db=db,
-                    protocol_name=protocol_name,
-                    chain=chain,
-                    time_window_days=time_window_days,
-                    current_risk_score=risk_score
-                )
+                "audit_status": _assess_audit_status(risk_score),
+                "comparison_to_peers": peer_comparison
             })
 
         logger.info(
-            f"Risk assessment completed for {protocol_name} "
-            f"(tier: {user_tier}, score: {risk_score}, level: {risk_level})"
+            "Risk assessment completed for %s (tier: %s, score: %d, level: %s)",
+            protocol_name, user_tier, risk_score, risk_level
         )
 
-        return result
+        # Errors fall through to the handler below and are not cached
+        with _risk_cache_lock:
+            if len(_risk_cache) >= RISK_CACHE_MAX_SIZE:
+                _risk_cache.clear()
+            _risk_cache[cache_key] = (time.monotonic(), result)
+
+        return copy.deepcopy(result)
 
     except Exception as e:
-        logger.error(f"Risk assessment failed for {protocol_name}: {e}")
+        logger.error("Risk assessment failed for %s: %s", protocol_name, e)
+        raise RuntimeError(f"Failed to assess protocol risk: {str(e)}")
+
+
+def assess_protocols_risk(
+    protocol_names: List[str],
+    chain: Optional[str] = None,
+    time_window_days: int = 90
+) -> List[Dict[str, Any]]:
+    """
+    Assess risk for many protocols with one query and one batch scoring pass.
+
+    Intended for portfolio scans. Each result has the personal-tier shape
+    of assess_protocol_risk, and protocols are matched the same way.
+
+    Args:
+        protocol_names: Names of the DeFi protocols to assess
+        chain: Optional blockchain filter (e.g., "Ethereum", "BSC")
+        time_window_days: Number of days to analyze (default: 90, max: 365)
+
+    Returns:
+        One risk assessment dict per protocol, in input order
+
+    Raises:
+        ValueError: If parameters are invalid
+        RuntimeError: If database query fails
+    """
+    if not protocol_names or not all(
+        name and isinstance(name, str) for name in protocol_names
+    ):
+        raise ValueError("protocol_names must be a list of non-empty strings")
+
+    if time_window_days < 1 or time_window_days > 365:
+        raise ValueError("time_window_days must be between 1 and 365")
+
+    # One target row per distinct lowercased name, joined against exploits
+    targets = list(dict.fromkeys(name.lower() for name in protocol_names))
+
+    try:
+        db = get_db()
+
+        query = f"""
+            WITH targets(name) AS (VALUES {", ".join(["(?)"] * len(targets))})
+            SELECT
+                t.name,
+                COUNT(e.id) as exploit_count,
+                COALESCE(AVG(e.amount_usd), 0) as avg_loss,
+                COALESCE(CAST(julianday('now')
+                    - julianday(MAX(e.timestamp), 'unixepoch') AS INTEGER), 0)
+                    as days_since_last,
+                COALESCE(CAST(julianday(MAX(e.timestamp), 'unixepoch')
+                    - julianday(MIN(e.timestamp), 'unixepoch') AS INTEGER), 0)
+                    as span_days
+            FROM targets t
+            LEFT JOIN exploits e
+                ON e.protocol_lc LIKE '%' || t.name || '%'
+                AND e.timestamp >= CAST(strftime('%s', 'now', ? || ' days') AS INTEGER)
+                AND e.is_test = 0
+        """
+        params = [*targets, -time_window_days]
+
+        if chain:
+            query += " AND e.chain = ?"
+            params.append(chain)
+
+        query += " GROUP BY t.name"
+
+        with db.get_ro_connection() as conn:
+            rows = {row["name"]: row for row in conn.execute(query, params)}
+
+        ordered = [rows[name] for name in targets]
+        scores = _calculate_risk_score_batch(
+            [row["exploit_count"] for row in ordered],
+            [row["avg_loss"] for row in ordered],
+            [row["days_since_last"] for row in ordered],
+            [row["span_days"] for row in ordered]
+        )
+        score_by_name = {name: int(score) for name, score in zip(targets, scores)}
+
+        assessed_at = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+        results = []
+        for name in protocol_names:
+            risk_score = score_by_name[name.lower()]
+            results.append({
+                "protocol": name,
+                "chain": chain,
+                "risk_score": risk_score,
+                "risk_level": _get_risk_level(risk_score),
+                "analysis_period_days": time_window_days,
+                "assessed_at": assessed_at
+            })
+
+        logger.info("Batch risk assessment completed for %d protocols", len(targets))
+
+        return results
+
+    except Exception as e:
+        logger.error("Batch risk assessment failed: %s", e)
         raise RuntimeError(f"Failed to assess protocol risk: {str(e)}")
 
 
 def _calculate_risk_score(
-    exploits: List[Dict[str, Any]],
-    time_window_days: int
+    exploit_count: int,
+    avg_loss: float,
+    days_since_last: Optional[int],
+    span_days: Optional[int]
 ) -> tuple[int, Dict[str, int]]:
     """
-    Calculate risk score (0-100) based on exploit history.
+    Calculate risk score (0-100) from aggregated exploit history.
+
+    Day counts are computed by SQLite, so no timestamps are parsed here.
 
     Returns tuple of (total_score, factor_breakdown)
     """
-    # Initialize scores
-    exploit_frequency_score = 0
-    severity_score = 0
-    recency_score = 0
-    maturity_score = 0
-
     # 1. Exploit Frequency Score (0-40 points)
-    # More exploits = higher risk
-    exploit_count = len(exploits)
-    if exploit_count == 0:
-        exploit_frequency_score = 0
-    elif exploit_count == 1:
-        exploit_frequency_score = 10
-    elif exploit_count == 2:
-        exploit_frequency_score = 20
-    elif exploit_count <= 4:
-        exploit_frequency_score = 30
-    else:  # 5+ exploits
-        exploit_frequency_score = 40
+    # More exploits = higher risk: 0, 1, 2, 3-4, 5+
+    exploit_frequency_score = _FREQUENCY_SCORE[
+        bisect.bisect_right(_FREQUENCY_THRESH, exploit_count)
+    ]
 
     # 2. Severity Score (0-30 points)
-    # Based on total value lost
-    if exploits:
-        total_loss = sum(e.get("amount_usd", 0) for e in exploits)
-        avg_loss = total_loss / len(exploits) if exploits else 0
-
-        if avg_loss >= 50_000_000:  # $50M+ average
-            severity_score = 30
-        elif avg_loss >= 10_000_000:  # $10M-50M average
-            severity_score = 25
-        elif avg_loss >= 1_000_000:  # $1M-10M average
-            severity_score = 20
-        elif avg_loss >= 100_000:  # $100K-1M average
-            severity_score = 15
-        elif avg_loss >= 10_000:  # $10K-100K average
-            severity_score = 10
-        else:  # < $10K average
-            severity_score = 5
+    # Based on average value lost: <$10K up to $50M+
+    severity_score = 0
+    if exploit_count:
+        severity_score = _SEVERITY_SCORE[bisect.bisect_right(_SEVERITY_THRESH, avg_loss)]
 
     # 3. Recency Score (0-20 points)
-    # More recent exploits = higher risk
-    if exploits:
-        latest_exploit = exploits[0]  # Already sorted by timestamp DESC
-        latest_timestamp = latest_exploit.get("timestamp")
-
-        if latest_timestamp:
-            # Parse timestamp
-            if isinstance(latest_timestamp, str):
-                latest_date = datetime.fromisoformat(latest_timestamp.replace('Z', '+00:00'))
-            else:
-                latest_date = latest_timestamp
-
-            days_since_last = (datetime.now() - latest_date.replace(tzinfo=None)).days
-
-            if days_since_last <= 7:  # Last week
-                recency_score = 20
-            elif days_since_last <= 30:  # Last month
-                recency_score = 15
-            elif days_since_last <= 90:  # Last 3 months
-                recency_score = 10
-            elif days_since_last <= 180:  # Last 6 months
-                recency_score = 5
-            else:  # Older than 6 months
-                recency_score = 2
+    # More recent exploits = higher risk: last week up to older than 6 months
+    recency_score = 0
+    if days_since_last is not None:
+        recency_score = _RECENCY_SCORE[bisect.bisect_left(_RECENCY_THRESH, days_since_last)]
 
     # 4. Maturity Score (0-10 points)
     # Protocols with exploits spread over time are higher risk
     # (indicates systemic issues rather than one-off incidents)
-    if len(exploits) >= 2:
-        # Calculate time span of exploits
-        timestamps = []
-        for e in exploits:
-            ts = e.get("timestamp")
-            if ts:
-                if isinstance(ts, str):
-                    timestamps.append(datetime.fromisoformat(ts.replace('Z', '+00:00')))
-                else:
-                    timestamps.append(ts)
-
-        if len(timestamps) >= 2:
-            time_span_days = (max(timestamps) - min(timestamps)).days
-
-            if time_span_days >= 180:  # 6+ months of recurring issues
-                maturity_score = 10
-            elif time_span_days >= 90:  # 3-6 months
-                maturity_score = 7
-            elif time_span_days >= 30:  # 1-3 months
-                maturity_score = 5
-            else:  # < 1 month (cluster of exploits)
-                maturity_score = 3
+    maturity_score = 0
+    if exploit_count >= 2 and span_days is not None:
+        maturity_score = _MATURITY_SCORE[bisect.bisect_right(_MATURITY_THRESH, span_days)]
 
     # Calculate total score
     total_score = min(
@@ -363,126 +562,195 @@ def _calculate_risk_score(
     return total_score, factor_breakdown
 
 
+def _calculate_risk_score_batch(
+    exploit_counts: Sequence[int],
+    avg_losses: Sequence[float],
+    days_since_last: Sequence[int],
+    span_days: Sequence[int]
+) -> Sequence[int]:
+    """
+    Calculate risk scores for many protocols at once.
+
+    Takes parallel sequences of the _calculate_risk_score inputs. Day and
+    loss values are ignored where the exploit count makes them meaningless,
+    so callers may pass 0 for protocols without exploits.
+
+    Returns an int8 numpy array when numpy is installed, otherwise a list.
+    """
+    if numba is not None:
+        return _score_batch_jit(
+            np.asarray(exploit_counts, dtype=np.int64),
+            np.asarray(avg_losses, dtype=np.float64),
+            np.asarray(days_since_last, dtype=np.int64),
+            np.asarray(span_days, dtype=np.int64)
+        )[0]
+
+    if np is None:
+        return [
+            _calculate_risk_score(
+                count, loss, days if count else None, span if count else None
+            )[0]
+            for count, loss, days, span in zip(
+                exploit_counts, avg_losses, days_since_last, span_days
+            )
+        ]
+
+    counts = np.asarray(exploit_counts)
+    frequency = np.take(
+        _FREQUENCY_SCORE, np.searchsorted(_FREQUENCY_THRESH, counts, side="right")
+    )
+    severity = np.take(
+        _SEVERITY_SCORE, np.searchsorted(_SEVERITY_THRESH, avg_losses, side="right")
+    )
+    recency = np.take(
+        _RECENCY_SCORE, np.searchsorted(_RECENCY_THRESH, days_since_last, side="left")
+    )
+    maturity = np.take(
+        _MATURITY_SCORE, np.searchsorted(_MATURITY_THRESH, span_days, side="right")
+    )
+
+    total = frequency + np.where(counts > 0, severity + recency, 0)
+    total += np.where(counts >= 2, maturity, 0)
+    return np.minimum(total, 100).astype(np.int8)
+
+
+def _score_batch(counts, avg_losses, days_since, span_days):
+    """
+    Score a batch of protocols from numpy arrays (compiled with numba).
+
+    Counting the thresholds a value passes is the same as bisecting the
+    sorted lookup tables, and needs nothing numba cannot compile.
+
+    Returns (int8 scores, (N, 4) int8 factor breakdown) with factor columns
+    in _calculate_risk_score order: frequency, severity, recency, maturity.
+    """
+    n = counts.shape[0]
+    scores = np.zeros(n, dtype=np.int8)
+    factors = np.zeros((n, 4), dtype=np.int8)
+
+    for i in numba.prange(n):
+        count = counts[i]
+
+        idx = 0
+        for threshold in _FREQUENCY_THRESH:
+            if count >= threshold:
+                idx += 1
+        frequency = _FREQUENCY_SCORE[idx]
+
+        severity = 0
+        recency = 0
+        if count > 0:
+            idx = 0
+            for threshold in _SEVERITY_THRESH:
+                if avg_losses[i] >= threshold:
+                    idx += 1
+            severity = _SEVERITY_SCORE[idx]
+
+            idx = 0
+            for threshold in _RECENCY_THRESH:
+                if days_since[i] > threshold:
+                    idx += 1
+            recency = _RECENCY_SCORE[idx]
+
+        maturity = 0
+        if count >= 2:
+            idx = 0
+            for threshold in _MATURITY_THRESH:
+                if span_days[i] >= threshold:
+                    idx += 1
+            maturity = _MATURITY_SCORE[idx]
+
+        factors[i, 0] = frequency
+        factors[i, 1] = severity
+        factors[i, 2] = recency
+        factors[i, 3] = maturity
+        scores[i] = min(frequency + severity + recency + maturity, 100)
+
+    return scores, factors
+
+
+if numba is not None:
+    _score_batch_jit = numba.njit(cache=True, parallel=True)(_score_batch)
+
+
 def _get_risk_level(risk_score: int) -> str:
     """Determine risk level from score."""
-    if risk_score < 30:
-        return "low"
-    elif risk_score < 60:
-        return "medium"
-    elif risk_score < 85:
-        return "high"
-    else:
-        return "critical"
-
-
-def _format_recent_exploits(exploits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Format exploit data for team tier response."""
-    formatted = []
-    for exploit in exploits:
-        timestamp = exploit.get("timestamp")
-        if timestamp:
-            if isinstance(timestamp, str):
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00')).isoformat() + "Z"
-            else:
-                timestamp = timestamp.isoformat() + "Z"
-
-        formatted.append({
-            "date": timestamp,
-            "chain": exploit.get("chain", "Unknown"),
-            "amount_usd": round(exploit.get("amount_usd", 0), 2),
-            "category": exploit.get("category", "Unknown"),
-            "description": exploit.get("description", "")[:200],  # Truncate long descriptions
-            "source_url": exploit.get("source_url")
-        })
-
-    return formatted
+    return _RISK_LEVELS[bisect.bisect_right(_RISK_CUTS, risk_score)]
+
+
+def _format_recent_exploits(exploits: Iterable[sqlite3.Row]) -> List[Dict[str, Any]]:
+    """Format exploit rows (description already truncated in SQL) for team tier response."""
+    return [
+        {
+            "date": exploit["date"],
+            "chain": exploit["chain"],
+            "amount_usd": round(exploit["amount_usd"] or 0, 2),
+            "category": exploit["category"],
+            "description": exploit["description"] or "",
+            "source_url": exploit["source_url"]
+        }
+        for exploit in exploits
+    ]
 
 
 def _generate_recommendations(
     risk_score: int,
     risk_level: str,
-    exploits: List[Dict[str, Any]],
+    category_flags: int,
     protocol_name: str
 ) -> List[str]:
-    """Generate actionable security recommendations based on risk assessment."""
-    recommendations = []
-
-    if risk_level == "critical":
-        recommendations.extend([
-            f"URGENT: Immediate security audit required for {protocol_name}",
-            "Consider pausing protocol interactions until vulnerabilities are addressed",
-            "Review all smart contract permissions and admin keys",
-            "Implement circuit breakers and emergency pause mechanisms if not present",
-            "Conduct comprehensive code review with focus on identified vulnerability patterns"
-        ])
-
-    elif risk_level == "high":
-        recommendations.extend([
-            f"High priority: Schedule comprehensive security audit for {protocol_name}",
-            "Review and strengthen access controls and multi-sig requirements",
-            "Implement monitoring and alerting for suspicious activity",
-            "Consider purchasing additional exploit insurance coverage",
-            "Establish incident response plan and test it regularly"
-        ])
-
-    elif risk_level == "medium":
-        recommendations.extend([
-            f"Moderate risk: Plan routine security assessment for {protocol_name}",
-            "Monitor protocol closely for unusual activity",
-            "Review recent exploit patterns to identify common vulnerabilities",
-            "Ensure security best practices are followed in all deployments",
-            "Stay informed about similar exploits in the ecosystem"
-        ])
-
-    else:  # low
-        recommendations.extend([
-            f"Low risk: Maintain current security practices for {protocol_name}",
-            "Continue regular security monitoring and updates",
-            "Participate in bug bounty programs to identify issues proactively",
-            "Keep dependencies and libraries up to date"
-        ])
+    """
+    Generate actionable security recommendations based on risk assessment.
+
+    category_flags is the OR of exploits.category_flags over the matched
+    exploits, so each attack pattern is a single bit test.
+    """
+    templates = _RECS_BY_LEVEL[risk_level]
+    recommendations = [templates[0].format(p=protocol_name), *templates[1:]]
 
     # Add specific recommendations based on exploit patterns
-    if exploits:
-        categories = [e.get("category", "").lower() for e in exploits]
+    recommendations.extend(rec for flag, rec in _CATEGORY_RECS if category_flags & flag)
 
-        if any("flash loan" in cat for cat in categories):
-            recommendations.append(
-                "Flash loan attacks detected: Implement flash loan protection mechanisms"
-            )
+    return recommendations
 
-        if any("reentrancy" in cat for cat in categories):
-            recommendations.append(
-                "Reentrancy vulnerabilities found: Review and fix reentrancy guards"
-            )
 
-        if any("oracle" in cat for cat in categories):
-            recommendations.append(
-                " Oracle manipulation detected: Use multiple oracle sources and price sanity checks"
-            )
+def _assess_audit_status(risk_score: int) -> str:
+    """Determine audit status/priority based on risk."""
+    return _AUDIT_LEVELS[bisect.bisect_right(_RISK_CUTS, risk_score)]
 
-        if any("access control" in cat or "admin" in cat for cat in categories):
-            recommendations.append(
-                " Access control issues: Implement robust multi-sig and timelock mechanisms"
-            )
 
-    return recommendations
+def _get_peer_stats(
+    conn,
+    chain: Optional[str],
+    time_window_days: int
+) -> Sequence[sqlite3.Row]:
+    """
+    Get per-protocol exploit totals for the time window, cached briefly.
 
+    Reads the daily rollup maintained by triggers on exploits.
+    """
+    cache_key = (chain, time_window_days)
+    with _risk_cache_lock:
+        cached = _peer_stats_cache.get(cache_key)
+    if cached and time.monotonic() - cached[0] < RISK_CACHE_TTL_SECONDS:
+        return cached[1]
 
-def _assess_audit_status(risk_score: int, exploits: List[Dict[str, Any]]) -> str:
-    """Determine audit status/priority based on risk."""
-    if risk_score >= 85:
-        return "critical_priority"
-    elif risk_score >= 60:
-        return "high_priority"
-    elif risk_score >= 30:
-        return "medium_priority"
-    else:
-        return "low_priority"
+    params = [-time_window_days]
+
+    if chain:
+        params.append(chain)
+
+    peer_data = tuple(conn.execute(_make_peer_sql(bool(chain)), params))
+
+    with _risk_cache_lock:
+        if len(_peer_stats_cache) >= PEER_STATS_CACHE_MAX_SIZE:
+            _peer_stats_cache.clear()
+        _peer_stats_cache[cache_key] = (time.monotonic(), peer_data)
+    return peer_data
 
 
 def _compare_to_peers(
-    db,
+    conn,
     protocol_name: str,
     chain: Optional[str],
     time_window_days: int,
@@ -490,35 +758,10 @@ def _compare_to_peers(
 ) -> Dict[str, Any]:
     """
     Compare protocol's risk to similar protocols in the ecosystem.
-    Enterprise tier feature.
+    Enterprise tier feature. Runs on the caller's open connection.
     """
     try:
-        # Get statistics for all protocols in the time window
-        since = datetime.now() - timedelta(days=time_window_days)
-
-        query = """
-            SELECT
-                protocol,
-                COUNT(*) as exploit_count,
-                SUM(amount_usd) as total_loss,
-                AVG(amount_usd) as avg_loss
-            FROM exploits
-            WHERE timestamp >= ?
-            AND LOWER(protocol) NOT LIKE '%test%'
-        """
-        params = [since]
-
-        if chain:
-            query += " AND chain = ?"
-            params.append(chain)
-
-        query += " GROUP BY protocol ORDER BY exploit_count DESC LIMIT 20"
-
-        with db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            peer_data = [dict(row) for row in rows]
+        peer_data = _get_peer_stats(conn, chain, time_window_days)
 
         if not peer_data:
             return {
@@ -526,14 +769,21 @@ def _compare_to_peers(
                 "message": "Not enough peer data for comparison"
             }
 
-        # Calculate percentile ranking
+        # Calculate percentile ranking; peer rows arrive ordered by
+        # exploit_count descending, so the protocols with more exploits
+        # than this one are exactly the leading rows
         total_peers = len(peer_data)
+        protocol_name_lower = protocol_name.lower()
         current_exploits = next(
-            (p["exploit_count"] for p in peer_data if p["protocol"].lower() == protocol_name.lower()),
+            (p["exploit_count"] for p in peer_data if p["protocol"].lower() == protocol_name_lower),
             0
         )
 
-        worse_than_count = sum(1 for p in peer_data if p["exploit_count"] > current_exploits)
+        worse_than_count = 0
+        for p in peer_data:
+            if p["exploit_count"] <= current_exploits:
+                break
+            worse_than_count += 1
         percentile = int((worse_than_count / total_peers) * 100) if total_peers > 0 else 50
 
         # Determine comparison status
@@ -550,8 +800,8 @@ def _compare_to_peers(
             comparison = "significantly_worse"
             message = f"{protocol_name} has significantly more exploits than peers"
 
-        # Get top 3 safest protocols for reference
-        safest_protocols = sorted(peer_data, key=lambda x: x["exploit_count"])[:3]
+        # Get top 3 safest protocols for reference (same order as a full sort)
+        safest_protocols = heapq.nsmallest(3, peer_data, key=lambda x: x["exploit_count"])
 
         return {
             "comparison": comparison,
@@ -569,7 +819,7 @@ def _compare_to_peers(
         }
 
     except Exception as e:
-        logger.error(f"Failed to compare to peers: {e}")
+        logger.error("Failed to compare to peers: %s", e)
         return {
             "comparison": "error",
             "message": f"Could not complete peer comparison: {str(e)}"
@@ -577,4 +827,4 @@ def _compare_to_peers(
 
 
 # Export for MCP server
-__all__ = ["assess_protocol_risk"]
+__all__ = ["assess_protocol_risk", "assess_protocols_risk"]
@@ -10,17 +10,70 @@ Tools for AI agents to interact with x402Resolve escrow system:
 - get_api_reputation: Check provider trust score
 - verify_payment: Confirm payment received
 - estimate_refund: Calculate refund by quality score
+- create_escrow_batch / check_escrow_status_batch: Batched variants
 """
 
+import asyncio
+import bisect
+import importlib.util
 import logging
-from typing import Dict, Any, Optional
+import time
+from typing import Dict, Any, List, Optional, Tuple
 import httpx
+import orjson
 
-from utils.quality_assessment import get_quality_assessor
+from utils.quality_assessment import (
+    get_quality_assessor,
+    estimate_refund as _estimate_refund
+)
 from utils.solana_client import get_solana_client
 
 logger = logging.getLogger(__name__)
 
+# Reputation changes slowly, so repeated polls for the same provider are
+# answered from memory for a short window instead of hitting the RPC
+_REPUTATION_CACHE_TTL_SECONDS = 30
+_REPUTATION_CACHE_MAX_SIZE = 512
+_reputation_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+# Score cutoffs (ascending) and the verdict for each band between them
+_QUALITY_CUTS = (50, 80)
+_QUALITY_RECOMMENDATIONS = ("dispute", "partial", "release")
+_REPUTATION_CUTS = (500, 700, 900)
+_REPUTATION_RECOMMENDATIONS = ("avoid", "caution", "reliable", "trusted")
+
+# Maximum number of items accepted by the batch tools
+MAX_BATCH_SIZE = 20
+
+# One HTTP client for all API provider calls, so repeat calls reuse pooled
+# keep-alive connections instead of paying a TCP and TLS handshake each time.
+# With HTTP/2, concurrent calls to one provider also share a connection;
+# servers without it are negotiated down to HTTP/1.1.
+_HTTP_TIMEOUT_SECONDS = 30.0
+_HTTP_LIMITS = httpx.Limits(max_connections=256, max_keepalive_connections=64)
+_HTTP2 = importlib.util.find_spec("h2") is not None  # httpx needs h2 for HTTP/2
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Get the shared HTTP client, creating it on first use"""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=_HTTP_TIMEOUT_SECONDS,
+            limits=_HTTP_LIMITS,
+            http2=_HTTP2
+        )
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Close the shared HTTP client (call on server shutdown)"""
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
 
 async def create_escrow(
     api_provider: str,
@@ -50,8 +103,9 @@ async def create_escrow(
     """
     try:
         logger.info(
-            f"Creating escrow: {amount_sol} SOL for {api_endpoint} "
-            f"(threshold: {quality_threshold})"
+            "Creating escrow: %s SOL for %s "
+            "(threshold: %s)",
+            amount_sol, api_endpoint, quality_threshold
         )
 
         # Validate inputs
@@ -74,14 +128,42 @@ async def create_escrow(
             time_lock_hours=time_lock_hours
         )
 
-        logger.info(f"Escrow created: {result['escrow_address']}")
+        logger.info("Escrow created: %s", result['escrow_address'])
         return result
 
     except Exception as e:
-        logger.error(f"Error creating escrow: {e}")
+        logger.error("Error creating escrow: %s", e)
         raise
 
 
+async def create_escrow_batch(
+    escrows: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """
+    Create several escrow payments concurrently
+
+    Args:
+        escrows: Up to MAX_BATCH_SIZE dicts of create_escrow arguments
+
+    Returns:
+        One create_escrow result per item, in input order; items that fail
+        get {"error", "message"} instead so one bad item doesn't sink the batch
+    """
+    if not 1 <= len(escrows) <= MAX_BATCH_SIZE:
+        raise ValueError(f"Batch must contain 1-{MAX_BATCH_SIZE} escrows")
+
+    return list(await asyncio.gather(*(_create_escrow_item(escrow) for escrow in escrows)))
+
+
+async def _create_escrow_item(escrow: Dict[str, Any]) -> Dict[str, Any]:
+    """create_escrow for one batch item, returning its failure in place"""
+    # Unpacking happens inside the try, so bad arguments only fail this item
+    try:
+        return await create_escrow(**escrow)
+    except Exception as e:
+        return {"error": type(e).__name__, "message": str(e)}
+
+
 async def call_api_with_escrow(
     api_provider: str,
     amount_sol: float,
@@ -113,39 +195,54 @@ async def call_api_with_escrow(
         }
     """
     try:
-        # Step 1: Create escrow
-        escrow = await create_escrow(
-            api_provider=api_provider,
-            amount_sol=amount_sol,
-            api_endpoint=api_endpoint,
-            quality_threshold=quality_criteria.get("quality_threshold", 80) if quality_criteria else 80
-        )
+        # Step 1: Create escrow. Encoding the request body doesn't depend on
+        # it, so run that on a worker thread while the escrow is created.
+        pending = [
+            create_escrow(
+                api_provider=api_provider,
+                amount_sol=amount_sol,
+                api_endpoint=api_endpoint,
+                quality_threshold=quality_criteria.get("quality_threshold", 80) if quality_criteria else 80
+            )
+        ]
+        if request_body:
+            pending.append(asyncio.to_thread(orjson.dumps, request_body))
+
+        escrow, *prepared = await asyncio.gather(*pending)
 
         # Step 2: Call API with payment proof
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            headers = {
-                "X-Payment-Proof": escrow["payment_proof"],
-                "Content-Type": "application/json"
-            }
+        client = _get_http_client()
+        headers = {
+            "X-Payment-Proof": escrow["payment_proof"],
+            "Content-Type": "application/json"
+        }
 
-            if request_body:
-                response = await client.post(
-                    api_endpoint,
-                    json=request_body,
-                    headers=headers
-                )
-            else:
-                response = await client.get(
-                    api_endpoint,
-                    headers=headers
-                )
-
-            response.raise_for_status()
-            api_data = response.json()
+        if request_body:
+            # Send the orjson-encoded body as-is rather than letting httpx
+            # encode it again with the stdlib json module
+            response = await client.post(
+                api_endpoint,
+                content=prepared[0],
+                headers=headers
+            )
+        else:
+            response = await client.get(
+                api_endpoint,
+                headers=headers
+            )
+
+        response.raise_for_status()
+        # orjson parses the raw bytes directly, which matters on large payloads
+        api_data = orjson.loads(response.content)
 
         # Step 3: Assess quality
         if quality_criteria:
-            assessment = await assess_data_quality(
+            # The full score and issues go back to the agent as dispute
+            # evidence, so no checks are skipped. Scoring a large response
+            # can take tens of ms, so keep it off the event loop that is
+            # serving other escrow calls.
+            assessment = await asyncio.to_thread(
+                assess_data_quality,
                 data=api_data,
                 expected_criteria=quality_criteria
             )
@@ -160,12 +257,9 @@ async def call_api_with_escrow(
 
         # Step 4: Determine recommendation
         quality_score = assessment["quality_score"]
-        if quality_score >= 80:
-            recommendation = "release"
-        elif quality_score >= 50:
-            recommendation = "partial"
-        else:
-            recommendation = "dispute"
+        recommendation = _QUALITY_RECOMMENDATIONS[
+            bisect.bisect_right(_QUALITY_CUTS, quality_score)
+        ]
 
         return {
             "escrow_address": escrow["escrow_address"],
@@ -178,16 +272,17 @@ async def call_api_with_escrow(
         }
 
     except httpx.HTTPError as e:
-        logger.error(f"API call failed: {e}")
+        logger.error("API call failed: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Error in call_api_with_escrow: {e}")
+        logger.error("Error in call_api_with_escrow: %s", e)
         raise
 
 
-async def assess_data_quality(
+def assess_data_quality(
     data: Any,
-    expected_criteria: Dict[str, Any]
+    expected_criteria: Dict[str, Any],
+    fast_path: bool = False
 ) -> Dict[str, Any]:
     """
     Assess quality of API response against expected criteria
@@ -200,6 +295,8 @@ async def assess_data_quality(
             - max_age_days: Maximum age of data in days
             - schema: Expected JSON schema
             - custom_validation: Natural language rules
+        fast_path: Skip checks that can't change a certain full refund;
+            see QualityAssessment.assess for how skipped checks are reported
 
     Returns:
         {
@@ -217,17 +314,18 @@ async def assess_data_quality(
         logger.info("Assessing data quality")
 
         assessor = get_quality_assessor()
-        result = assessor.assess(data, expected_criteria)
+        result = assessor.assess(data, expected_criteria, fast_path=fast_path)
 
         logger.info(
-            f"Quality assessment complete: score={result['quality_score']}, "
-            f"refund={result['refund_percentage']}%"
+            "Quality assessment complete: score=%s, "
+            "refund=%s%%",
+            result['quality_score'], result['refund_percentage']
         )
 
         return result
 
     except Exception as e:
-        logger.error(f"Error assessing quality: {e}")
+        logger.error("Error assessing quality: %s", e)
         raise
 
 
@@ -259,8 +357,9 @@ async def file_dispute(
     """
     try:
         logger.info(
-            f"Filing dispute for escrow {escrow_address}: "
-            f"quality={quality_score}, refund={refund_percentage}%"
+            "Filing dispute for escrow %s: "
+            "quality=%s, refund=%s%%",
+            escrow_address, quality_score, refund_percentage
         )
 
         # Validate inputs
@@ -279,11 +378,11 @@ async def file_dispute(
             refund_percentage=refund_percentage
         )
 
-        logger.info(f"Dispute filed: {result['dispute_id']}")
+        logger.info("Dispute filed: %s", result['dispute_id'])
         return result
 
     except Exception as e:
-        logger.error(f"Error filing dispute: {e}")
+        logger.error("Error filing dispute: %s", e)
         raise
 
 
@@ -309,16 +408,42 @@ async def check_escrow_status(
         }
     """
     try:
-        logger.info(f"Checking escrow status: {escrow_address}")
+        logger.info("Checking escrow status: %s", escrow_address)
 
         solana_client = get_solana_client()
         result = await solana_client.check_escrow_status(escrow_address)
 
-        logger.info(f"Escrow status: {result['status']}")
+        logger.info("Escrow status: %s", result['status'])
         return result
 
     except Exception as e:
-        logger.error(f"Error checking escrow status: {e}")
+        logger.error("Error checking escrow status: %s", e)
+        raise
+
+
+async def check_escrow_status_batch(
+    escrow_addresses: List[str]
+) -> List[Dict[str, Any]]:
+    """
+    Check status of several escrow payments with one RPC round trip
+
+    Args:
+        escrow_addresses: Up to MAX_BATCH_SIZE escrow account addresses
+
+    Returns:
+        One check_escrow_status result per address, in input order
+    """
+    if not 1 <= len(escrow_addresses) <= MAX_BATCH_SIZE:
+        raise ValueError(f"Batch must contain 1-{MAX_BATCH_SIZE} escrow addresses")
+
+    try:
+        logger.info("Checking status of %s escrows", len(escrow_addresses))
+
+        solana_client = get_solana_client()
+        return await solana_client.check_escrow_status_batch(escrow_addresses)
+
+    except Exception as e:
+        logger.error("Error checking escrow status batch: %s", e)
         raise
 
 
@@ -342,30 +467,37 @@ async def get_api_reputation(
             "recommendation": str
         }
     """
+    now = time.monotonic()
+    cached = _reputation_cache.get(api_provider)
+    # Results are flat, so a shallow copy keeps callers off the cached dict
+    if cached and now - cached[0] < _REPUTATION_CACHE_TTL_SECONDS:
+        return dict(cached[1])
+
     try:
-        logger.info(f"Checking reputation for: {api_provider}")
+        logger.info("Checking reputation for: %s", api_provider)
 
         solana_client = get_solana_client()
         result = await solana_client.get_api_reputation(api_provider)
 
         # Determine recommendation
         score = result["reputation_score"]
-        if score >= 900:
-            result["recommendation"] = "trusted"
-        elif score >= 700:
-            result["recommendation"] = "reliable"
-        elif score >= 500:
-            result["recommendation"] = "caution"
-        else:
-            result["recommendation"] = "avoid"
+        result["recommendation"] = _REPUTATION_RECOMMENDATIONS[
+            bisect.bisect_right(_REPUTATION_CUTS, score)
+        ]
 
         logger.info(
-            f"Reputation: {score}/1000 ({result['recommendation']})"
+            "Reputation: %s/1000 (%s)",
+            score, result['recommendation']
         )
-        return result
+
+        # Only successful lookups are cached so failures retry immediately
+        if len(_reputation_cache) >= _REPUTATION_CACHE_MAX_SIZE:
+            _reputation_cache.clear()
+        _reputation_cache[api_provider] = (now, result)
+        return dict(result)
 
     except Exception as e:
-        logger.error(f"Error getting reputation: {e}")
+        logger.error("Error getting reputation: %s", e)
         raise
 
 
@@ -393,7 +525,7 @@ async def verify_payment(
         }
     """
     try:
-        logger.info(f"Verifying payment: {transaction_hash}")
+        logger.info("Verifying payment: %s", transaction_hash)
 
         solana_client = get_solana_client()
         result = await solana_client.verify_payment(
@@ -402,11 +534,11 @@ async def verify_payment(
             expected_recipient=expected_recipient
         )
 
-        logger.info(f"Payment verified: {result['verified']}")
+        logger.info("Payment verified: %s", result['verified'])
         return result
 
     except Exception as e:
-        logger.error(f"Error verifying payment: {e}")
+        logger.error("Error verifying payment: %s", e)
         raise
 
 
@@ -431,18 +563,20 @@ def estimate_refund(
     """
     try:
         logger.info(
-            f"Estimating refund: {amount_sol} SOL, quality={quality_score}"
+            "Estimating refund: %s SOL, quality=%s",
+            amount_sol, quality_score
         )
 
-        solana_client = get_solana_client()
-        result = solana_client.estimate_refund(amount_sol, quality_score)
+        # Pure arithmetic, so there is no need to touch the Solana client
+        result = _estimate_refund(amount_sol, quality_score)
 
         logger.info(
-            f"Refund estimate: {result['refund_sol']} SOL "
-            f"({result['refund_percentage']}%)"
+            "Refund estimate: %s SOL "
+            "(%s%%)",
+            result['refund_sol'], result['refund_percentage']
         )
         return result
 
     except Exception as e:
-        logger.error(f"Error estimating refund: {e}")
+        logger.error("Error estimating refund: %s", e)
         raise
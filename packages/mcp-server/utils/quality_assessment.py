@@ -8,27 +8,186 @@ Implements scoring logic for HTTP 402 API responses based on:
 """
 
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 from dateutil import parser as date_parser
+import hashlib
 import logging
+import threading
+import time
+
+import orjson
+
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:  # The stdlib ISO parser is also C-implemented
+    _parse_iso = datetime.fromisoformat
+
+try:
+    import numpy as np
+except ImportError:  # Batch scoring falls back to pure Python
+    np = None
+
+try:
+    import numba
+except ImportError:  # Batch scoring uses numpy (or pure Python) instead
+    numba = None
 
 logger = logging.getLogger(__name__)
 
+# Agents often re-assess the same response (retries, dispute flow), so
+# results are kept briefly by content fingerprint. The TTL is short because
+# freshness scores drift with the clock.
+ASSESS_CACHE_TTL_SECONDS = 60
+ASSESS_CACHE_MAX_SIZE = 512
+
+# Default for the field_scan arguments: scan required fields on demand
+_NOT_SCANNED = object()
+# Marks a required field that is absent from the record
+_MISSING = object()
+
+
+def refund_percentage(quality_score: float) -> int:
+    """
+    Calculate refund percentage based on quality score
+
+    Refund logic:
+    - Quality >= 80: 0% refund (good delivery)
+    - Quality 50-79: Sliding scale (partial refund)
+    - Quality < 50: 100% refund (failed delivery)
+    """
+    if quality_score >= 80:
+        return 0
+    elif quality_score >= 50:
+        # Sliding scale: 0% at 80, 100% at 50
+        return int((80 - quality_score) / 30 * 100)
+    else:
+        # Full refund for quality < 50
+        return 100
+
+
+def estimate_refund(amount_sol: float, quality_score: float) -> Dict[str, Any]:
+    """
+    Estimate refund amount based on quality score
+
+    Returns:
+        {
+            "refund_sol": float,
+            "payment_sol": float,
+            "refund_percentage": int,
+            "rationale": str
+        }
+    """
+    refund_pct = refund_percentage(quality_score)
+    if quality_score >= 80:
+        rationale = "Quality meets threshold - no refund"
+    elif quality_score >= 50:
+        rationale = f"Partial refund - quality score {quality_score}/100"
+    else:
+        rationale = f"Full refund - quality score {quality_score}/100 below threshold"
+
+    refund_sol = amount_sol * (refund_pct / 100)
+    payment_sol = amount_sol - refund_sol
+
+    return {
+        "refund_sol": round(refund_sol, 6),
+        "payment_sol": round(payment_sol, 6),
+        "refund_percentage": refund_pct,
+        "rationale": rationale
+    }
+
+
+def estimate_refund_batch(
+    amounts_sol: Sequence[float],
+    quality_scores: Sequence[float]
+) -> Dict[str, Sequence]:
+    """
+    Estimate refunds for many escrows at once
+
+    Same arithmetic as estimate_refund, without the rationale strings
+    and without rounding the SOL amounts to 6 decimals.
+
+    Returns:
+        {"refund_sol", "payment_sol", "refund_percentage"} with one entry
+        per escrow in each; numpy arrays when numpy is installed, otherwise
+        lists
+    """
+    if np is None:
+        refund_pcts = [refund_percentage(score) for score in quality_scores]
+        refunds = [amount * (pct / 100) for amount, pct in zip(amounts_sol, refund_pcts)]
+        return {
+            "refund_sol": refunds,
+            "payment_sol": [amount - refund for amount, refund in zip(amounts_sol, refunds)],
+            "refund_percentage": refund_pcts
+        }
+
+    amounts = np.asarray(amounts_sol, dtype=np.float64)
+    refund_pcts = _refund_percentages(np.asarray(quality_scores, dtype=np.float64))
+    refunds = amounts * (refund_pcts / 100)
+    return {
+        "refund_sol": refunds,
+        "payment_sol": amounts - refunds,
+        "refund_percentage": refund_pcts
+    }
+
+
+def _refund_percentages(quality_scores):
+    """refund_percentage over a numpy array of quality scores"""
+    return np.where(
+        quality_scores >= 80, 0,
+        np.where(
+            quality_scores >= 50,
+            ((80 - quality_scores) / 30 * 100).astype(np.int64),
+            100
+        )
+    )
+
 
 class QualityAssessment:
     """Assess quality of API response data"""
 
+    # Only the memo cache is per instance
+    __slots__ = ("_cache", "_cache_lock")
+
+    # Category weights of the overall quality score
+    WEIGHTS = {
+        "completeness": 0.40,
+        "freshness": 0.30,
+        "schema_compliance": 0.30
+    }
+    # (category, weight) pairs iterated by _calculate_weighted_score
+    WEIGHT_ITEMS = tuple(WEIGHTS.items())
+
+    # Field names tried in priority order when looking for a data timestamp
+    _TIMESTAMP_FIELDS = (
+        "timestamp", "created_at", "updated_at", "date", "time",
+        "createdAt", "updatedAt", "datetime", "last_updated"
+    )
+
+    # JSON schema type -> Python type name
+    _TYPE_MAP = {
+        "object": "dict",
+        "array": "list",
+        "string": "str",
+        "number": "float",
+        "integer": "int",
+        "boolean": "bool"
+    }
+
     def __init__(self):
-        self.weights = {
-            "completeness": 0.40,
-            "freshness": 0.30,
-            "schema_compliance": 0.30
-        }
+        self._cache: Dict[bytes, Tuple[float, Dict[str, Any]]] = {}
+        self._cache_lock = threading.Lock()
+
+    def invalidate_cache(self) -> None:
+        """Drop all memoized assessments"""
+        with self._cache_lock:
+            self._cache.clear()
 
     def assess(
         self,
         data: Any,
-        expected_criteria: Dict[str, Any]
+        expected_criteria: Dict[str, Any],
+        use_cache: bool = True,
+        fast_path: bool = False
     ) -> Dict[str, Any]:
         """
         Assess data quality based on criteria
@@ -41,6 +200,12 @@ class QualityAssessment:
                 - max_age_days: Maximum age of data in days
                 - schema: Expected JSON schema
                 - custom_validation: Natural language rules
+            use_cache: Reuse a recent result for identical inputs
+            fast_path: Skip schema compliance when even a perfect score
+                there can't lift quality above the full-refund cutoff (50).
+                The refund is 100% either way. A skipped check is reported
+                as "skipped" in assessment_details, its issues are not
+                listed, and quality_score is only an upper bound.
 
         Returns:
             {
@@ -54,13 +219,76 @@ class QualityAssessment:
                 }
             }
         """
+        key = self._fingerprint(data, expected_criteria, fast_path) if use_cache else None
+        if key is None:
+            return self._assess(data, expected_criteria, fast_path)
+
+        now = time.monotonic()
+        with self._cache_lock:
+            cached = self._cache.get(key)
+        if cached and now - cached[0] < ASSESS_CACHE_TTL_SECONDS:
+            return self._copy_result(cached[1])
+
+        result = self._assess(data, expected_criteria, fast_path)
+
+        with self._cache_lock:
+            if len(self._cache) >= ASSESS_CACHE_MAX_SIZE:
+                self._cache.clear()
+            self._cache[key] = (now, result)
+
+        return self._copy_result(result)
+
+    @staticmethod
+    def _fingerprint(
+        data: Any,
+        expected_criteria: Dict[str, Any],
+        fast_path: bool
+    ) -> Optional[bytes]:
+        """Content hash of the inputs, or None if they aren't JSON-serializable"""
+        try:
+            payload = orjson.dumps(
+                [data, expected_criteria, fast_path],
+                option=orjson.OPT_SORT_KEYS
+            )
+        except TypeError:
+            return None
+        return hashlib.blake2b(payload, digest_size=16).digest()
+
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy the mutable parts of a result so callers can't alter the cache"""
+        return {
+            **result,
+            "issues_found": list(result["issues_found"]),
+            "assessment_details": dict(result["assessment_details"])
+        }
+
+    def _assess(
+        self,
+        data: Any,
+        expected_criteria: Dict[str, Any],
+        fast_path: bool = False
+    ) -> Dict[str, Any]:
+        """Uncached assessment; see assess()"""
         scores = {}
         issues = []
 
+        has_min = "min_records" in expected_criteria
+        has_fields = "required_fields" in expected_criteria
+        has_age = "max_age_days" in expected_criteria
+        has_schema = "schema" in expected_criteria
+
+        # Completeness and schema compliance both look at the required
+        # fields of the first record; walk them once for both
+        field_scan = (
+            self._scan_required_fields(data, expected_criteria["required_fields"])
+            if has_fields else None
+        )
+
         # Assess completeness
-        if "min_records" in expected_criteria or "required_fields" in expected_criteria:
+        if has_min or has_fields:
             completeness, completeness_issues = self._assess_completeness(
-                data, expected_criteria
+                data, expected_criteria, field_scan
             )
             scores["completeness"] = completeness
             issues.extend(completeness_issues)
@@ -68,9 +296,9 @@ class QualityAssessment:
             scores["completeness"] = 100  # Default if not assessed
 
         # Assess freshness
-        if "max_age_days" in expected_criteria:
+        if has_age:
             freshness, freshness_issues = self._assess_freshness(
-                data, expected_criteria["max_age_days"]
+                data, expected_criteria["max_age_days"], datetime.now()
             )
             scores["freshness"] = freshness
             issues.extend(freshness_issues)
@@ -78,9 +306,18 @@ class QualityAssessment:
             scores["freshness"] = 100  # Default if not assessed
 
         # Assess schema compliance
-        if "required_fields" in expected_criteria or "schema" in expected_criteria:
+        skipped = None
+        if fast_path and (has_fields or has_schema) and (
+            scores["completeness"] * self.WEIGHTS["completeness"]
+            + scores["freshness"] * self.WEIGHTS["freshness"]
+            + 100 * self.WEIGHTS["schema_compliance"]
+        ) < 50:
+            # Full refund is already certain; score with the best case
+            scores["schema_compliance"] = 100
+            skipped = "schema_compliance"
+        elif has_fields or has_schema:
             compliance, compliance_issues = self._assess_schema_compliance(
-                data, expected_criteria
+                data, expected_criteria, field_scan
             )
             scores["schema_compliance"] = compliance
             issues.extend(compliance_issues)
@@ -98,16 +335,54 @@ class QualityAssessment:
             "issues_found": issues,
             "refund_percentage": refund_percentage,
             "assessment_details": {
-                "completeness": round(scores["completeness"], 2),
-                "freshness": round(scores["freshness"], 2),
-                "schema_compliance": round(scores["schema_compliance"], 2)
+                category: "skipped" if category == skipped else round(score, 2)
+                for category, score in scores.items()
             }
         }
 
+    @staticmethod
+    def _scan_required_fields(
+        data: Any,
+        required_fields: List[str]
+    ) -> Optional[Tuple[List[str], List[str]]]:
+        """
+        Check required fields on the first record in one pass
+
+        Returns:
+            (missing, empty) field names, or None if there is no dict
+            record to check. Missing means absent or None; empty means
+            present but None, "" or [].
+        """
+        if not isinstance(data, (dict, list)):
+            return None
+
+        # For lists, check first item
+        check_data = data[0] if isinstance(data, list) and len(data) > 0 else data
+        if not isinstance(check_data, dict):
+            return None
+
+        if not check_data:
+            return list(required_fields), []
+
+        missing = []
+        empty = []
+        get = check_data.get
+        for field in required_fields:
+            value = get(field, _MISSING)
+            if value is _MISSING:
+                missing.append(field)
+            elif value is None:
+                missing.append(field)
+                empty.append(field)
+            elif value == "" or (isinstance(value, list) and not value):
+                empty.append(field)
+        return missing, empty
+
     def _assess_completeness(
         self,
         data: Any,
-        criteria: Dict[str, Any]
+        criteria: Dict[str, Any],
+        field_scan: Any = _NOT_SCANNED
     ) -> tuple[float, List[str]]:
         """Assess data completeness (40% weight)"""
         score = 0
@@ -136,23 +411,20 @@ class QualityAssessment:
                 score = 100
 
         # Check required fields presence
-        if "required_fields" in criteria and isinstance(data, (dict, list)):
+        if "required_fields" in criteria:
             required_fields = criteria["required_fields"]
+            if field_scan is _NOT_SCANNED:
+                field_scan = self._scan_required_fields(data, required_fields)
 
-            # For lists, check first item
-            check_data = data[0] if isinstance(data, list) and len(data) > 0 else data
-
-            if isinstance(check_data, dict):
-                missing_fields = [
-                    field for field in required_fields
-                    if field not in check_data or check_data[field] is None
-                ]
+            if field_scan is not None:
+                missing_fields = field_scan[0]
 
                 if missing_fields:
                     issues.append(
                         f"Missing required fields: {', '.join(missing_fields)}"
                     )
-                    field_score = ((len(required_fields) - len(missing_fields)) / len(required_fields)) * 100
+                    field_count = len(required_fields)
+                    field_score = ((field_count - len(missing_fields)) / field_count) * 100
                     score = max(score, field_score) if "min_records" in criteria else field_score
                 else:
                     score = 100
@@ -162,9 +434,12 @@ class QualityAssessment:
     def _assess_freshness(
         self,
         data: Any,
-        max_age_days: int
+        max_age_days: int,
+        now: Optional[datetime] = None
     ) -> tuple[float, List[str]]:
         """Assess data freshness (30% weight)"""
+        if now is None:
+            now = datetime.now()
         score = 100
         issues = []
 
@@ -173,18 +448,23 @@ class QualityAssessment:
             timestamp = self._extract_timestamp(data)
 
             if timestamp:
-                # Parse timestamp
-                if isinstance(timestamp, str):
-                    data_time = date_parser.parse(timestamp)
-                elif isinstance(timestamp, (int, float)):
-                    # Assume Unix timestamp
-                    data_time = datetime.fromtimestamp(timestamp)
+                if isinstance(timestamp, (int, float)):
+                    # Assume Unix timestamp; no datetime needed for the age
+                    age_days = (now.timestamp() - timestamp) / 86400
                 else:
-                    data_time = timestamp
-
-                # Calculate age
-                age = datetime.now() - data_time.replace(tzinfo=None)
-                age_days = age.days + (age.seconds / 86400)
+                    # Parse timestamp
+                    if isinstance(timestamp, str):
+                        # ISO-8601 is the common case; dateutil handles the rest
+                        try:
+                            data_time = _parse_iso(timestamp)
+                        except ValueError:
+                            data_time = date_parser.parse(timestamp)
+                    else:
+                        data_time = timestamp
+
+                    # Calculate age
+                    age = now - data_time.replace(tzinfo=None)
+                    age_days = age.days + (age.seconds / 86400)
 
                 if age_days > max_age_days:
                     issues.append(
@@ -203,7 +483,7 @@ class QualityAssessment:
                 issues.append("No timestamp found for freshness validation")
 
         except Exception as e:
-            logger.error(f"Error assessing freshness: {e}")
+            logger.error("Error assessing freshness: %s", e)
             score = 50
             issues.append(f"Could not assess freshness: {str(e)}")
 
@@ -212,26 +492,25 @@ class QualityAssessment:
     def _assess_schema_compliance(
         self,
         data: Any,
-        criteria: Dict[str, Any]
+        criteria: Dict[str, Any],
+        field_scan: Any = _NOT_SCANNED
     ) -> tuple[float, List[str]]:
         """Assess schema compliance (30% weight)"""
         score = 100
         issues = []
 
         # Check required fields (if not already checked in completeness)
-        if "required_fields" in criteria and isinstance(data, (dict, list)):
+        if "required_fields" in criteria:
             required_fields = criteria["required_fields"]
-            check_data = data[0] if isinstance(data, list) and len(data) > 0 else data
-
-            if isinstance(check_data, dict):
-                # Check field types and values
-                for field in required_fields:
-                    if field in check_data:
-                        value = check_data[field]
-                        # Check for null/empty values
-                        if value is None or value == "" or (isinstance(value, list) and len(value) == 0):
-                            issues.append(f"Field '{field}' is null or empty")
-                            score -= (100 / len(required_fields))
+            if field_scan is _NOT_SCANNED:
+                field_scan = self._scan_required_fields(data, required_fields)
+
+            if field_scan is not None:
+                # Check for null/empty values
+                empty_fields = field_scan[1]
+                if empty_fields:
+                    issues.extend(f"Field '{field}' is null or empty" for field in empty_fields)
+                    score = 100 * (len(required_fields) - len(empty_fields)) / len(required_fields)
 
         # Check schema structure (basic validation)
         if "schema" in criteria:
@@ -256,16 +535,7 @@ class QualityAssessment:
             expected_type = schema.get("type")
             actual_type = type(data).__name__
 
-            type_map = {
-                "object": "dict",
-                "array": "list",
-                "string": "str",
-                "number": "float",
-                "integer": "int",
-                "boolean": "bool"
-            }
-
-            if expected_type and type_map.get(expected_type) != actual_type:
+            if expected_type and self._TYPE_MAP.get(expected_type) != actual_type:
                 issues.append(
                     f"Type mismatch: Expected {expected_type}, got {actual_type}"
                 )
@@ -274,13 +544,13 @@ class QualityAssessment:
             # Check properties (for objects)
             if expected_type == "object" and isinstance(data, dict):
                 properties = schema.get("properties", {})
-                for prop, prop_schema in properties.items():
-                    if prop not in data:
-                        issues.append(f"Missing property: {prop}")
-                        score -= (50 / len(properties))
+                missing = [prop for prop in properties if prop not in data]
+                if missing:
+                    issues.extend(f"Missing property: {prop}" for prop in missing)
+                    score -= 50 / len(properties) * len(missing)
 
         except Exception as e:
-            logger.error(f"Schema validation error: {e}")
+            logger.error("Schema validation error: %s", e)
             issues.append(f"Schema validation failed: {str(e)}")
             score = 50
 
@@ -288,49 +558,192 @@ class QualityAssessment:
 
     def _extract_timestamp(self, data: Any) -> Optional[Any]:
         """Extract timestamp from data"""
-        timestamp_fields = [
-            "timestamp", "created_at", "updated_at", "date", "time",
-            "createdAt", "updatedAt", "datetime", "last_updated"
-        ]
-
-        if isinstance(data, dict):
-            for field in timestamp_fields:
-                if field in data:
-                    return data[field]
-            # Check nested data
-            if "data" in data and isinstance(data["data"], list) and len(data["data"]) > 0:
-                return self._extract_timestamp(data["data"][0])
-
-        elif isinstance(data, list) and len(data) > 0:
-            return self._extract_timestamp(data[0])
+        # Walk down first items and nested "data" lists without recursing
+        while True:
+            if isinstance(data, dict):
+                for field in self._TIMESTAMP_FIELDS:
+                    if field in data:
+                        return data[field]
+                # Check nested data
+                nested = data.get("data")
+                if not (isinstance(nested, list) and nested):
+                    return None
+                data = nested[0]
+
+            elif isinstance(data, list) and data:
+                data = data[0]
 
-        return None
+            else:
+                return None
 
     def _calculate_weighted_score(self, scores: Dict[str, float]) -> float:
         """Calculate weighted average score"""
-        total_score = 0
-        for category, score in scores.items():
-            weight = self.weights.get(category, 0)
-            total_score += score * weight
-        return min(max(total_score, 0), 100)
+        total_score = 0.0
+        for category, weight in self.WEIGHT_ITEMS:
+            total_score += scores[category] * weight
+        return 0.0 if total_score < 0 else (100.0 if total_score > 100 else total_score)
 
     def _calculate_refund(self, quality_score: float) -> int:
+        """Calculate refund percentage based on quality score"""
+        return refund_percentage(quality_score)
+
+    def assess_records(
+        self,
+        records: List[Any],
+        expected_criteria: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         """
-        Calculate refund percentage based on quality score
+        Assess each record of a list response on its own
+
+        Per-record scores show which rows were bad, which makes sharper
+        dispute evidence than one score for the whole response. min_records
+        is ignored; an array schema's "items" schema is applied per record.
+
+        Args:
+            records: Records from an API response
+            expected_criteria: Same quality requirements as assess()
 
-        Refund logic:
-        - Quality >= 80: 0% refund (good delivery)
-        - Quality 50-79: Sliding scale (partial refund)
-        - Quality < 50: 100% refund (failed delivery)
+        Returns:
+            One {"quality_score", "issues_found", "refund_percentage",
+            "assessment_details"} dict per record, in input order
         """
-        if quality_score >= 80:
-            return 0
-        elif quality_score >= 50:
-            # Sliding scale: 0% at 80, 100% at 50
-            return int((80 - quality_score) / 30 * 100)
+        record_criteria = {
+            key: expected_criteria[key]
+            for key in ("required_fields",)
+            if key in expected_criteria
+        }
+        schema = expected_criteria.get("schema")
+        if isinstance(schema, dict) and isinstance(schema.get("items"), dict):
+            record_criteria["schema"] = schema["items"]
+
+        has_fields = "required_fields" in record_criteria
+        has_compliance = has_fields or "schema" in record_criteria
+        max_age_days = expected_criteria.get("max_age_days")
+        now = datetime.now()
+
+        n = len(records)
+        completeness = [100.0] * n
+        freshness = [100.0] * n
+        compliance = [100.0] * n
+        record_issues: List[List[str]] = [[] for _ in range(n)]
+
+        for i, record in enumerate(records):
+            issues = record_issues[i]
+            field_scan = (
+                self._scan_required_fields(record, record_criteria["required_fields"])
+                if has_fields else None
+            )
+            if has_fields:
+                completeness[i], found = self._assess_completeness(
+                    record, record_criteria, field_scan
+                )
+                issues.extend(found)
+            if max_age_days is not None:
+                freshness[i], found = self._assess_freshness(record, max_age_days, now)
+                issues.extend(found)
+            if has_compliance:
+                compliance[i], found = self._assess_schema_compliance(
+                    record, record_criteria, field_scan
+                )
+                issues.extend(found)
+
+        scores, refunds = self._calculate_weighted_score_batch(
+            completeness, freshness, compliance
+        )
+
+        return [
+            {
+                "quality_score": round(float(scores[i]), 2),
+                "issues_found": record_issues[i],
+                "refund_percentage": int(refunds[i]),
+                "assessment_details": {
+                    "completeness": round(completeness[i], 2),
+                    "freshness": round(freshness[i], 2),
+                    "schema_compliance": round(compliance[i], 2)
+                }
+            }
+            for i in range(n)
+        ]
+
+    def _calculate_weighted_score_batch(
+        self,
+        completeness: Sequence[float],
+        freshness: Sequence[float],
+        compliance: Sequence[float]
+    ) -> Tuple[Sequence[float], Sequence[int]]:
+        """
+        Calculate quality scores and refund percentages for many records
+
+        Takes parallel sequences of per-category scores and returns
+        (quality scores, refund percentages), as numpy arrays when numpy is
+        installed, otherwise as lists.
+        """
+        weights = self.WEIGHTS
+        w_c = weights["completeness"]
+        w_f = weights["freshness"]
+        w_s = weights["schema_compliance"]
+
+        if numba is not None:
+            return _score_records_jit(
+                np.asarray(completeness, dtype=np.float64),
+                np.asarray(freshness, dtype=np.float64),
+                np.asarray(compliance, dtype=np.float64),
+                w_c, w_f, w_s
+            )
+
+        if np is None:
+            scores = [
+                self._calculate_weighted_score({
+                    "completeness": c, "freshness": f, "schema_compliance": s
+                })
+                for c, f, s in zip(completeness, freshness, compliance)
+            ]
+            return scores, [refund_percentage(score) for score in scores]
+
+        scores = np.clip(
+            0.0
+            + np.asarray(completeness, dtype=np.float64) * w_c
+            + np.asarray(freshness, dtype=np.float64) * w_f
+            + np.asarray(compliance, dtype=np.float64) * w_s,
+            0.0, 100.0
+        )
+        return scores, _refund_percentages(scores)
+
+
+def _score_records(completeness, freshness, compliance, w_c, w_f, w_s):
+    """
+    Weighted quality scores and refund percentages (compiled with numba)
+
+    Same arithmetic as _calculate_weighted_score and refund_percentage,
+    one record per element of the input arrays.
+    """
+    n = completeness.shape[0]
+    scores = np.empty(n, dtype=np.float64)
+    refunds = np.empty(n, dtype=np.int64)
+
+    for i in numba.prange(n):
+        total = 0.0
+        total += completeness[i] * w_c
+        total += freshness[i] * w_f
+        total += compliance[i] * w_s
+        if total < 0:
+            total = 0.0
+        elif total > 100:
+            total = 100.0
+        scores[i] = total
+
+        if total >= 80:
+            refunds[i] = 0
+        elif total >= 50:
+            refunds[i] = int((80 - total) / 30 * 100)
         else:
-            # Full refund for quality < 50
-            return 100
+            refunds[i] = 100
+
+    return scores, refunds
+
+
+if numba is not None:
+    _score_records_jit = numba.njit(cache=True, parallel=True)(_score_records)
 
 
 # Singleton instance
@@ -10,42 +10,110 @@ Handles:
 """
 
 import os
+import json
+from functools import lru_cache
+import hashlib
 import logging
-from typing import Dict, Any, Optional
+import struct
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from datetime import datetime, timedelta
 import base58
+import httpx
+import orjson
 
 from solana.rpc.async_api import AsyncClient
 from solana.rpc.commitment import Confirmed
+from solana.rpc.types import DataSliceOpts, MemcmpOpts
 from solders.keypair import Keypair
 from solders.pubkey import Pubkey as PublicKey
 from solders.transaction import Transaction
 from solders.system_program import transfer, TransferParams, ID as SYS_PROGRAM_ID
 
+from utils.quality_assessment import estimate_refund
+
 logger = logging.getLogger(__name__)
 
+# Connection settings, resolved once from the environment
+SOLANA_RPC_URL = os.getenv("SOLANA_RPC_URL", "https://api.devnet.solana.com")
+X402_PROGRAM_ID = os.getenv("X402_PROGRAM_ID", "E5EiaJhbg6Bav1v3P211LNv1tAqa4fHVeuGgRBHsEu6n")
+
+
+# Default escrow time lock, and the oracle's assessment window for disputes
+_DEFAULT_TIME_LOCK = timedelta(hours=24)
+_ORACLE_ASSESSMENT_WINDOW = timedelta(hours=24)
+
+# Transaction IDs are 8 random bytes in hex, sliced from entropy read in bulk
+# so bursts of escrow creation don't each pay a getrandom syscall
+_TRANSACTION_ID_BYTES = 8
+_ENTROPY_REFILL_BYTES = 4096
+_entropy_pool = bytearray()
+_entropy_lock = threading.Lock()
+# A forked child must not hand out the parent's remaining IDs
+if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_entropy_pool.clear)
+
+
+_LAMPORTS_PER_SOL = 1_000_000_000
+
+# Anchor accounts are an 8-byte discriminator followed by the Borsh-encoded
+# fields. Fixed-size runs are unpacked with structs compiled once here.
+_ANCHOR_DISCRIMINATOR_SIZE = 8
+
+# Escrow: agent, api, amount, status, created_at, expires_at, then the
+# variable-length transaction_id (u32 length prefix), bump, and two Option<u8>
+_ESCROW_DISCRIMINATOR = hashlib.sha256(b"account:Escrow").digest()[:8]
+_ESCROW_HEAD = struct.Struct("<32s32sQBqq")
+_ESCROW_STRING_LEN = struct.Struct("<I")
+# Discriminator, head, empty transaction_id, bump and two None options
+_ESCROW_MIN_SIZE = _ANCHOR_DISCRIMINATOR_SIZE + _ESCROW_HEAD.size + _ESCROW_STRING_LEN.size + 3
+_ESCROW_STATUSES = ("active", "released", "disputed", "resolved")
+
+# EntityReputation: entity, entity_type, five u64 counters, average quality
+# (u8), score (u16), created_at, last_updated and the bump. Sweeps only fetch
+# entity through score.
+_REPUTATION_DISCRIMINATOR = hashlib.sha256(b"account:EntityReputation").digest()[:8]
+_REPUTATION_ACCOUNT_SIZE = 101
+_REPUTATION = struct.Struct("<32sB5QBHqqB")
+_REPUTATION_SUMMARY = struct.Struct("<32sB5QBH")
+
+
+# PDA derivation hashes seed candidates until one lands off the curve, and
+# the result only depends on the seeds and program, so remember it
+@lru_cache(maxsize=4096)
+def _find_escrow_pda(transaction_id: str, program_id: PublicKey) -> tuple[PublicKey, int]:
+    """Derive (and cache) the escrow PDA for a transaction ID"""
+    seeds = [b"escrow", transaction_id.encode()]
+    return PublicKey.find_program_address(seeds, program_id)
+
+
+@lru_cache(maxsize=4096)
+def _find_reputation_pda(entity_pubkey: PublicKey, program_id: PublicKey) -> tuple[PublicKey, int]:
+    """Derive (and cache) the reputation PDA for an entity"""
+    seeds = [b"reputation", bytes(entity_pubkey)]
+    return PublicKey.find_program_address(seeds, program_id)
+
 
 class X402ResolveClient:
     """Client for interacting with x402Resolve Solana program"""
 
+    # Most accounts a single getMultipleAccounts request may ask for
+    MAX_MULTIPLE_ACCOUNTS = 100
+    # Timeout for raw JSON-RPC batch requests
+    RPC_BATCH_TIMEOUT_SECONDS = 30.0
+
     def __init__(
         self,
         rpc_url: Optional[str] = None,
         program_id: Optional[str] = None,
         agent_keypair: Optional[Keypair] = None
     ):
-        self.rpc_url = rpc_url or os.getenv(
-            "SOLANA_RPC_URL",
-            "https://api.devnet.solana.com"
-        )
-        self.program_id = PublicKey(
-            program_id or os.getenv(
-                "X402_PROGRAM_ID",
-                "E5EiaJhbg6Bav1v3P211LNv1tAqa4fHVeuGgRBHsEu6n"
-            )
-        )
+        self.rpc_url = rpc_url or SOLANA_RPC_URL
+        self.program_id = PublicKey.from_string(program_id or X402_PROGRAM_ID)
         self.client = AsyncClient(self.rpc_url, commitment=Confirmed)
         self.agent_keypair = agent_keypair or self._load_agent_keypair()
+        # Created on first _rpc_batch call
+        self._http: Optional[httpx.AsyncClient] = None
 
     def _load_agent_keypair(self) -> Optional[Keypair]:
         """Load agent wallet from environment"""
@@ -59,7 +127,6 @@ class X402ResolveClient:
             # Try to load from AGENT_WALLET_PATH
             wallet_path = os.getenv("AGENT_WALLET_PATH")
             if wallet_path and os.path.exists(wallet_path):
-                import json
                 with open(wallet_path, 'r') as f:
                     keypair_data = json.load(f)
                     return Keypair.from_secret_key(bytes(keypair_data))
@@ -68,7 +135,7 @@ class X402ResolveClient:
             return None
 
         except Exception as e:
-            logger.error(f"Failed to load agent keypair: {e}")
+            logger.error("Failed to load agent keypair: %s", e)
             return None
 
     async def create_escrow(
@@ -111,8 +178,9 @@ class X402ResolveClient:
             # For now, this is a placeholder that shows the structure
 
             logger.info(
-                f"Creating escrow: {amount_sol} SOL to {api_provider} "
-                f"for {api_endpoint} (threshold: {quality_threshold})"
+                "Creating escrow: %s SOL to %s "
+                "for %s (threshold: %s)",
+                amount_sol, api_provider, api_endpoint, quality_threshold
             )
 
             # In production, you would:
@@ -122,7 +190,10 @@ class X402ResolveClient:
             # 4. Wait for confirmation
 
             # Placeholder response
-            expires_at = datetime.now() + timedelta(hours=time_lock_hours)
+            time_lock = (
+                _DEFAULT_TIME_LOCK if time_lock_hours == 24 else timedelta(hours=time_lock_hours)
+            )
+            expires_at = datetime.now() + time_lock
 
             return {
                 "escrow_address": str(escrow_pda),
@@ -136,7 +207,7 @@ class X402ResolveClient:
             }
 
         except Exception as e:
-            logger.error(f"Failed to create escrow: {e}")
+            logger.error("Failed to create escrow: %s", e)
             raise
 
     async def check_escrow_status(
@@ -159,7 +230,7 @@ class X402ResolveClient:
             }
         """
         try:
-            escrow_pubkey = PublicKey(escrow_address)
+            escrow_pubkey = PublicKey.from_string(escrow_address)
 
             # Fetch account data
             response = await self.client.get_account_info(escrow_pubkey)
@@ -167,23 +238,99 @@ class X402ResolveClient:
             if not response.value:
                 raise ValueError(f"Escrow account not found: {escrow_address}")
 
-            # TODO: Deserialize Anchor account data
-            # For now, return placeholder
+            return self._escrow_status(escrow_address, response.value)
 
-            return {
-                "status": "active",
-                "agent": str(self.agent_keypair.public_key) if self.agent_keypair else "unknown",
-                "api_provider": "placeholder",
-                "amount_sol": 0.001,
-                "created_at": datetime.now().isoformat(),
-                "expires_at": (datetime.now() + timedelta(hours=24)).isoformat(),
-                "escrow_address": escrow_address
-            }
+        except Exception as e:
+            logger.error("Failed to check escrow status: %s", e)
+            raise
+
+    async def check_escrow_status_batch(
+        self,
+        escrow_addresses: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Check status of several escrow payments
+
+        Accounts are fetched with getMultipleAccounts, so N escrows cost one
+        RPC round trip (per 100 addresses) instead of N.
+
+        Returns:
+            One check_escrow_status result per address, in input order;
+            missing or non-escrow accounts get {"escrow_address", "error"}
+            instead
+        """
+        try:
+            accounts = await self._get_multiple_accounts(
+                [PublicKey.from_string(address) for address in escrow_addresses]
+            )
+
+            results = []
+            for address, account in zip(escrow_addresses, accounts):
+                if not account:
+                    results.append({
+                        "escrow_address": address,
+                        "error": f"Escrow account not found: {address}"
+                    })
+                    continue
+                try:
+                    results.append(self._escrow_status(address, account))
+                except ValueError as e:
+                    results.append({"escrow_address": address, "error": str(e)})
+            return results
 
         except Exception as e:
-            logger.error(f"Failed to check escrow status: {e}")
+            logger.error("Failed to check escrow status batch: %s", e)
             raise
 
+    def _escrow_status(self, escrow_address: str, account: Any) -> Dict[str, Any]:
+        """Build escrow status from fetched account data"""
+        data = bytes(account.data)
+        invalid = ValueError(f"Not an escrow account: {escrow_address}")
+        if (
+            account.owner != self.program_id
+            or len(data) < _ESCROW_MIN_SIZE
+            or data[:_ANCHOR_DISCRIMINATOR_SIZE] != _ESCROW_DISCRIMINATOR
+        ):
+            raise invalid
+
+        agent, api, amount, status, created_at, expires_at = _ESCROW_HEAD.unpack_from(
+            data, _ANCHOR_DISCRIMINATOR_SIZE
+        )
+
+        if status >= len(_ESCROW_STATUSES):
+            raise invalid
+        try:
+            created = datetime.fromtimestamp(created_at)
+            expires = datetime.fromtimestamp(expires_at)
+        except (OverflowError, OSError, ValueError):
+            raise invalid from None
+
+        result = {
+            "status": _ESCROW_STATUSES[status],
+            "agent": str(PublicKey.from_bytes(agent)),
+            "api_provider": str(PublicKey.from_bytes(api)),
+            "amount_sol": amount / _LAMPORTS_PER_SOL,
+            "created_at": created.isoformat(),
+            "expires_at": expires.isoformat(),
+            "escrow_address": escrow_address
+        }
+
+        # Skip transaction_id and the bump to reach the two Option<u8> fields
+        offset = _ANCHOR_DISCRIMINATOR_SIZE + _ESCROW_HEAD.size
+        (id_len,) = _ESCROW_STRING_LEN.unpack_from(data, offset)
+        offset += _ESCROW_STRING_LEN.size + id_len + 1
+        for field in ("quality_score", "refund_percentage"):
+            tag = data[offset] if offset < len(data) else None
+            if tag == 0:
+                offset += 1
+            elif tag == 1 and offset + 1 < len(data):
+                result[field] = data[offset + 1]
+                offset += 2
+            else:
+                raise invalid
+
+        return result
+
     async def file_dispute(
         self,
         escrow_address: str,
@@ -207,8 +354,9 @@ class X402ResolveClient:
 
         try:
             logger.info(
-                f"Filing dispute for escrow {escrow_address}: "
-                f"quality={quality_score}, refund={refund_percentage}%"
+                "Filing dispute for escrow %s: "
+                "quality=%s, refund=%s%%",
+                escrow_address, quality_score, refund_percentage
             )
 
             # TODO: Build mark_disputed instruction
@@ -219,7 +367,7 @@ class X402ResolveClient:
             return {
                 "dispute_id": dispute_id,
                 "status": "pending_oracle",
-                "oracle_assessment_eta": (datetime.now() + timedelta(hours=24)).isoformat(),
+                "oracle_assessment_eta": (datetime.now() + _ORACLE_ASSESSMENT_WINDOW).isoformat(),
                 "transaction_id": dispute_id,
                 "escrow_address": escrow_address,
                 "quality_score": quality_score,
@@ -227,7 +375,7 @@ class X402ResolveClient:
             }
 
         except Exception as e:
-            logger.error(f"Failed to file dispute: {e}")
+            logger.error("Failed to file dispute: %s", e)
             raise
 
     async def get_api_reputation(
@@ -249,7 +397,7 @@ class X402ResolveClient:
             }
         """
         try:
-            provider_pubkey = PublicKey(api_provider)
+            provider_pubkey = PublicKey.from_string(api_provider)
 
             # Derive reputation PDA
             reputation_pda, _ = self._derive_reputation_pda(provider_pubkey)
@@ -257,33 +405,146 @@ class X402ResolveClient:
             # Fetch reputation account
             response = await self.client.get_account_info(reputation_pda)
 
-            if not response.value:
-                # No reputation data yet (new provider)
-                return {
-                    "reputation_score": 0,
-                    "total_transactions": 0,
-                    "disputes_filed": 0,
-                    "disputes_won": 0,
-                    "disputes_lost": 0,
-                    "average_quality_provided": 0,
-                    "recommendation": "caution",
-                    "note": "New provider - no reputation data"
-                }
+            return self._reputation(response.value)
+
+        except Exception as e:
+            logger.error("Failed to get reputation: %s", e)
+            raise
+
+    async def get_api_reputations(
+        self,
+        api_providers: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Check on-chain reputation of several API providers
+
+        All reputation PDAs are derived up front and fetched with
+        getMultipleAccounts, one RPC round trip per 100 providers.
+
+        Returns:
+            One get_api_reputation result per provider, in input order;
+            accounts that aren't reputations get {"api_provider", "error"}
+            instead
+        """
+        try:
+            reputation_pdas = [
+                self._derive_reputation_pda(PublicKey.from_string(provider))[0]
+                for provider in api_providers
+            ]
+            accounts = await self._get_multiple_accounts(reputation_pdas)
+
+            results = []
+            for provider, account in zip(api_providers, accounts):
+                try:
+                    results.append(self._reputation(account))
+                except ValueError as e:
+                    results.append({"api_provider": provider, "error": str(e)})
+            return results
 
-            # TODO: Deserialize reputation account
-            # Placeholder data
+        except Exception as e:
+            logger.error("Failed to get reputations: %s", e)
+            raise
+
+    def _reputation(self, account: Any) -> Dict[str, Any]:
+        """Build reputation from a fetched account (None if missing)"""
+        if not account:
+            # No reputation data yet (new provider)
             return {
-                "reputation_score": 750,
-                "total_transactions": 100,
-                "disputes_filed": 5,
-                "disputes_won": 3,
-                "disputes_lost": 2,
-                "average_quality_provided": 85.5,
-                "recommendation": "trusted"
+                "reputation_score": 0,
+                "total_transactions": 0,
+                "disputes_filed": 0,
+                "disputes_won": 0,
+                "disputes_lost": 0,
+                "average_quality_provided": 0,
+                "recommendation": "caution",
+                "note": "New provider - no reputation data"
             }
 
+        data = bytes(account.data)
+        if (
+            account.owner != self.program_id
+            or len(data) < _REPUTATION_ACCOUNT_SIZE
+            or data[:_ANCHOR_DISCRIMINATOR_SIZE] != _REPUTATION_DISCRIMINATOR
+        ):
+            raise ValueError("Not a reputation account")
+
+        (
+            _entity, _entity_type, total_transactions, disputes_filed,
+            disputes_won, _disputes_partial, disputes_lost, average_quality,
+            reputation_score, _created_at, _last_updated, _bump
+        ) = _REPUTATION.unpack_from(data, _ANCHOR_DISCRIMINATOR_SIZE)
+
+        if reputation_score >= 700:
+            recommendation = "trusted"
+        elif reputation_score >= 500:
+            recommendation = "caution"
+        else:
+            recommendation = "avoid"
+
+        return {
+            "reputation_score": reputation_score,
+            "total_transactions": total_transactions,
+            "disputes_filed": disputes_filed,
+            "disputes_won": disputes_won,
+            "disputes_lost": disputes_lost,
+            "average_quality_provided": average_quality,
+            "recommendation": recommendation
+        }
+
+    async def list_reputations(self, min_score: int = 0) -> List[Dict[str, Any]]:
+        """
+        List every on-chain reputation with a score of at least min_score
+
+        One getProgramAccounts call returns all reputation accounts: the node
+        drops other account types via the size and discriminator filters,
+        and only the entity-through-score slice of each account is sent.
+        RPC filters can't compare ranges, so min_score is applied here.
+
+        Returns:
+            Reputations sorted by score, highest first
+        """
+        try:
+            response = await self.client.get_program_accounts(
+                self.program_id,
+                commitment=Confirmed,
+                encoding="base64",
+                data_slice=DataSliceOpts(
+                    offset=_ANCHOR_DISCRIMINATOR_SIZE,
+                    length=_REPUTATION_SUMMARY.size
+                ),
+                filters=[
+                    _REPUTATION_ACCOUNT_SIZE,
+                    MemcmpOpts(offset=0, bytes=base58.b58encode(_REPUTATION_DISCRIMINATOR).decode())
+                ]
+            )
+
+            reputations = []
+            for keyed in response.value:
+                (
+                    entity, entity_type, total_transactions, disputes_filed,
+                    disputes_won, disputes_partial, disputes_lost,
+                    average_quality, reputation_score
+                ) = _REPUTATION_SUMMARY.unpack(keyed.account.data)
+                if reputation_score < min_score:
+                    continue
+                reputations.append({
+                    "entity": str(PublicKey.from_bytes(entity)),
+                    "entity_type": "provider" if entity_type else "agent",
+                    "reputation_score": reputation_score,
+                    "total_transactions": total_transactions,
+                    "disputes_filed": disputes_filed,
+                    "disputes_won": disputes_won,
+                    "disputes_partial": disputes_partial,
+                    "disputes_lost": disputes_lost,
+                    "average_quality_provided": average_quality,
+                    "account": str(keyed.pubkey)
+                })
+
+            reputations.sort(key=lambda rep: rep["reputation_score"], reverse=True)
+            return reputations
+
         except Exception as e:
-            logger.error(f"Failed to get reputation: {e}")
+            logger.error("Failed to list reputations: %s", e)
             raise
 
     async def verify_payment(
@@ -309,26 +570,12 @@ class X402ResolveClient:
             # Get transaction details
             response = await self.client.get_transaction(transaction_hash)
 
-            if not response.value:
-                return {
-                    "verified": False,
-                    "error": "Transaction not found"
-                }
-
-            # TODO: Parse transaction and verify details
-            # Placeholder verification
-            return {
-                "verified": True,
-                "amount_sol": expected_amount or 0.001,
-                "sender": "placeholder_sender",
-                "recipient": expected_recipient or "placeholder_recipient",
-                "timestamp": datetime.now().isoformat(),
-                "confirmations": 32,
-                "transaction_hash": transaction_hash
-            }
+            return self._payment_verification(
+                transaction_hash, response.value, expected_amount, expected_recipient
+            )
 
         except Exception as e:
-            logger.error(f"Failed to verify payment: {e}")
+            logger.error("Failed to verify payment: %s", e)
             raise
 
     def estimate_refund(
@@ -347,45 +594,149 @@ class X402ResolveClient:
                 "rationale": str
             }
         """
-        # Calculate refund percentage
-        if quality_score >= 80:
-            refund_pct = 0
-            rationale = "Quality meets threshold - no refund"
-        elif quality_score >= 50:
-            refund_pct = int((80 - quality_score) / 30 * 100)
-            rationale = f"Partial refund - quality score {quality_score}/100"
-        else:
-            refund_pct = 100
-            rationale = f"Full refund - quality score {quality_score}/100 below threshold"
-
-        refund_sol = amount_sol * (refund_pct / 100)
-        payment_sol = amount_sol - refund_sol
-
-        return {
-            "refund_sol": round(refund_sol, 6),
-            "payment_sol": round(payment_sol, 6),
-            "refund_percentage": refund_pct,
-            "rationale": rationale
-        }
+        return estimate_refund(amount_sol, quality_score)
 
     def _derive_escrow_pda(self, transaction_id: str) -> tuple[PublicKey, int]:
         """Derive PDA for escrow account"""
-        seeds = [b"escrow", transaction_id.encode()]
-        return PublicKey.find_program_address(seeds, self.program_id)
+        return _find_escrow_pda(transaction_id, self.program_id)
 
     def _derive_reputation_pda(self, entity_pubkey: PublicKey) -> tuple[PublicKey, int]:
         """Derive PDA for reputation account"""
-        seeds = [b"reputation", bytes(entity_pubkey)]
-        return PublicKey.find_program_address(seeds, self.program_id)
+        return _find_reputation_pda(entity_pubkey, self.program_id)
 
     def _generate_transaction_id(self) -> str:
-        """Generate unique transaction ID"""
-        import uuid
-        return str(uuid.uuid4())[:16]
+        """Generate unique transaction ID (16 hex characters)"""
+        with _entropy_lock:
+            if len(_entropy_pool) < _TRANSACTION_ID_BYTES:
+                _entropy_pool.extend(os.urandom(_ENTROPY_REFILL_BYTES))
+            id_bytes = _entropy_pool[-_TRANSACTION_ID_BYTES:]
+            del _entropy_pool[-_TRANSACTION_ID_BYTES:]
+        return id_bytes.hex()
+
+    async def verify_payments(
+        self,
+        transaction_hashes: List[str]
+    ) -> List[Dict[str, Any]]:
+        """
+        Verify several payments with one JSON-RPC batch request
+
+        Returns:
+            One verify_payment result per hash, in input order
+        """
+        try:
+            results = await self._rpc_batch([
+                (
+                    "getTransaction",
+                    [
+                        transaction_hash,
+                        {
+                            "encoding": "json",
+                            "commitment": "confirmed",
+                            "maxSupportedTransactionVersion": 0
+                        }
+                    ]
+                )
+                for transaction_hash in transaction_hashes
+            ])
+
+            return [
+                self._payment_verification(transaction_hash, result.get("result"))
+                if "error" not in result else {
+                    "verified": False,
+                    "error": result["error"].get("message", "RPC error"),
+                    "transaction_hash": transaction_hash
+                }
+                for transaction_hash, result in zip(transaction_hashes, results)
+            ]
+
+        except Exception as e:
+            logger.error("Failed to verify payments: %s", e)
+            raise
+
+    @staticmethod
+    def _payment_verification(
+        transaction_hash: str,
+        transaction: Any,
+        expected_amount: Optional[float] = None,
+        expected_recipient: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Build payment verification from a fetched transaction (None if missing)"""
+        if not transaction:
+            return {
+                "verified": False,
+                "error": "Transaction not found"
+            }
+
+        # TODO: Parse transaction and verify details
+        # Placeholder verification
+        return {
+            "verified": True,
+            "amount_sol": expected_amount or 0.001,
+            "sender": "placeholder_sender",
+            "recipient": expected_recipient or "placeholder_recipient",
+            "timestamp": datetime.now().isoformat(),
+            "confirmations": 32,
+            "transaction_hash": transaction_hash
+        }
+
+    async def _get_multiple_accounts(self, pubkeys: Sequence[PublicKey]) -> List[Any]:
+        """Fetch accounts with getMultipleAccounts (None for missing ones), in input order"""
+        accounts = []
+        for start in range(0, len(pubkeys), self.MAX_MULTIPLE_ACCOUNTS):
+            response = await self.client.get_multiple_accounts(
+                pubkeys[start:start + self.MAX_MULTIPLE_ACCOUNTS]
+            )
+            accounts.extend(response.value)
+        return accounts
+
+    async def _rpc_batch(self, calls: Sequence[Tuple[str, list]]) -> List[Dict[str, Any]]:
+        """
+        Send several JSON-RPC calls in one HTTP request
+
+        Args:
+            calls: (method, params) pairs
+
+        Returns:
+            The response object for each call, in call order (servers may
+            answer a batch out of order, so responses are matched by id)
+        """
+        if not calls:
+            return []
+
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(timeout=self.RPC_BATCH_TIMEOUT_SECONDS)
+
+        response = await self._http.post(
+            self.rpc_url,
+            content=orjson.dumps([
+                {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+                for i, (method, params) in enumerate(calls)
+            ]),
+            headers={"Content-Type": "application/json"}
+        )
+        response.raise_for_status()
+
+        body = orjson.loads(response.content)
+        # Nodes that reject a whole batch (rate limits, batch size caps) may
+        # answer with one error object instead of an array; it applies to
+        # every call
+        if isinstance(body, dict) and "error" in body:
+            return [body] * len(calls)
+        if not isinstance(body, list):
+            raise ValueError(f"Unexpected JSON-RPC batch response: {type(body).__name__}")
+
+        by_id = {item.get("id"): item for item in body if isinstance(item, dict)}
+        return [
+            by_id.get(i, {"error": {"message": "No response for request"}})
+            for i in range(len(calls))
+        ]
 
     async def close(self):
         """Close the RPC client connection"""
         await self.client.close()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
 
 
 # Singleton instance
@@ -19,17 +19,63 @@ config = X402Config(
     quality_guarantee=True
 )
 
-app.middleware("http")(x402_payment_middleware(config))
+payment_middleware = x402_payment_middleware(config)
+app.middleware("http")(payment_middleware)
+app.add_event_handler("shutdown", payment_middleware.aclose)
 ```
 """
 
 from dataclasses import dataclass
-from typing import Optional, Callable
+from typing import Any, Dict, Optional, Callable, Tuple
+import asyncio
+import importlib.util
+import time
 from fastapi import Request, Response
 from fastapi.responses import JSONResponse
 from solders.pubkey import Pubkey
 import httpx
 
+try:
+    import orjson
+except ImportError:  # Fall back to the stdlib json encoder
+    orjson = None
+
+# Escrow checks reuse pooled keep-alive connections to the RPC endpoint
+# (multiplexed over HTTP/2 when h2 is installed) instead of a new TCP and
+# TLS handshake per gated request
+RPC_TIMEOUT_SECONDS = 5.0
+RPC_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+_HTTP2 = importlib.util.find_spec("h2") is not None
+
+# Clients retry with the same X-Payment-Proof in bursts, so a successful
+# check is remembered briefly and concurrent checks of one escrow share a
+# single RPC call. Failures aren't cached: the escrow may appear moments later.
+VERIFY_CACHE_TTL_SECONDS = 10
+VERIFY_CACHE_MAX_SIZE = 10_000
+_EscrowKey = Tuple[str, str, str]  # (rpc_url, program_id, escrow_pubkey)
+_verified_escrows: Dict[_EscrowKey, float] = {}
+_pending_checks: Dict[_EscrowKey, "asyncio.Future[bool]"] = {}
+
+# A base58-encoded 32-byte public key is 32 to 44 characters long
+_PUBKEY_MIN_LEN = 32
+_PUBKEY_MAX_LEN = 44
+
+
+def invalidate_escrow_cache() -> None:
+    """Forget all cached escrow verifications"""
+    _verified_escrows.clear()
+
+
+class _ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson"""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+# FastAPI's own ORJSONResponse is deprecated, so subclass JSONResponse
+_JSONResponse = JSONResponse if orjson is None else _ORJSONResponse
+
 
 @dataclass
 class X402Config:
@@ -41,34 +87,108 @@ class X402Config:
     quality_guarantee: bool = False
 
 
-async def verify_escrow(escrow_pubkey: str, program_id: str, rpc_url: str) -> bool:
-    """Verify escrow account exists and is owned by program"""
+def create_rpc_client() -> httpx.AsyncClient:
+    """Create a pooled HTTP client for escrow verification"""
+    return httpx.AsyncClient(
+        timeout=RPC_TIMEOUT_SECONDS,
+        limits=RPC_LIMITS,
+        http2=_HTTP2
+    )
+
+
+async def verify_escrow(
+    escrow_pubkey: str,
+    program_id: str,
+    rpc_url: str,
+    client: Optional[httpx.AsyncClient] = None
+) -> bool:
+    """
+    Verify escrow account exists and is owned by program
+
+    Pass a long-lived client to reuse its connections; without one, a
+    client is opened and closed for each RPC call.
+    """
+    # Malformed proofs can't name an account, so reject them without I/O
+    if not _PUBKEY_MIN_LEN <= len(escrow_pubkey) <= _PUBKEY_MAX_LEN:
+        return False
     try:
-        pubkey = Pubkey.from_string(escrow_pubkey)
+        Pubkey.from_string(escrow_pubkey)
+    except ValueError:
+        return False
+
+    key = (rpc_url, program_id, escrow_pubkey)
+    now = time.monotonic()
+    verified_at = _verified_escrows.get(key)
+    if verified_at is not None and now - verified_at < VERIFY_CACHE_TTL_SECONDS:
+        return True
 
-        async with httpx.AsyncClient() as client:
+    pending = _pending_checks.get(key)
+    if pending is not None:
+        return await asyncio.shield(pending)
+
+    future = asyncio.get_running_loop().create_future()
+    _pending_checks[key] = future
+    try:
+        if client is None:
+            async with create_rpc_client() as one_off:
+                valid = await _check_escrow(escrow_pubkey, program_id, rpc_url, one_off)
+        else:
+            valid = await _check_escrow(escrow_pubkey, program_id, rpc_url, client)
+
+        if valid:
+            if len(_verified_escrows) >= VERIFY_CACHE_MAX_SIZE:
+                _verified_escrows.clear()
+            _verified_escrows[key] = now
+        future.set_result(valid)
+        return valid
+    finally:
+        del _pending_checks[key]
+        if not future.done():
+            # Cancelled mid-check; waiters fail closed rather than hang
+            future.set_result(False)
+
+
+async def _check_escrow(
+    escrow_pubkey: str,
+    program_id: str,
+    rpc_url: str,
+    client: httpx.AsyncClient
+) -> bool:
+    """Look up the escrow account over RPC and check its owner"""
+    try:
+        payload = {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "getAccountInfo",
+            "params": [
+                escrow_pubkey,
+                # Only the owner is read, so skip the account data
+                {
+                    "encoding": "base64",
+                    "dataSlice": {"offset": 0, "length": 0},
+                    "commitment": "confirmed"
+                }
+            ]
+        }
+
+        if orjson is not None:
             response = await client.post(
                 rpc_url,
-                json={
-                    "jsonrpc": "2.0",
-                    "id": 1,
-                    "method": "getAccountInfo",
-                    "params": [
-                        str(pubkey),
-                        {"encoding": "jsonParsed"}
-                    ]
-                }
+                content=orjson.dumps(payload),
+                headers={"Content-Type": "application/json"}
             )
-
+            data = orjson.loads(response.content)
+        else:
+            response = await client.post(rpc_url, json=payload)
             data = response.json()
 
-            if not data.get("result") or not data["result"].get("value"):
-                return False
+        if not data.get("result") or not data["result"].get("value"):
+            return False
 
-            account = data["result"]["value"]
-            owner = account.get("owner")
+        account = data["result"]["value"]
+        owner = account.get("owner")
 
-            return owner == program_id
+        return owner == program_id
 
     except Exception:
         return False
@@ -81,45 +201,67 @@ def x402_payment_middleware(config: X402Config) -> Callable:
     Returns a middleware function that checks for payment proof
     in X-Payment-Proof header. If missing, returns 402 status.
     If present, validates escrow and attaches to request state.
+
+    The returned function has an ``aclose`` coroutine that closes its
+    pooled RPC client; register it as an app shutdown handler.
     """
+    rpc_client: Optional[httpx.AsyncClient] = None
+
+    # The 402 challenge depends only on the config, so render it once
+    payment_required_headers = {
+        "WWW-Authenticate": f'Solana realm="{config.realm}"',
+        "X-Escrow-Address": "Required",
+        "X-Price": f"{config.price} SOL",
+        "X-Quality-Guarantee": "true" if config.quality_guarantee else "false",
+        "X-Program-Id": config.program_id
+    }
+    payment_required_body = _JSONResponse(content={
+        "error": "Payment Required",
+        "message": "This API requires payment via Solana escrow",
+        "amount": config.price,
+        "currency": "SOL",
+        "escrow_program": config.program_id,
+        "quality_guarantee": config.quality_guarantee,
+        "payment_flow": {
+            "step_1": "Create escrow with specified amount",
+            "step_2": "Retry request with X-Payment-Proof header",
+            "step_3": "Receive data with quality score",
+            "step_4": "Automatic dispute if quality < threshold"
+        }
+    }).body
+
+    def get_rpc_client() -> httpx.AsyncClient:
+        nonlocal rpc_client
+        if rpc_client is None or rpc_client.is_closed:
+            rpc_client = create_rpc_client()
+        return rpc_client
+
+    async def aclose() -> None:
+        nonlocal rpc_client
+        if rpc_client is not None:
+            await rpc_client.aclose()
+            rpc_client = None
 
     async def middleware(request: Request, call_next):
         payment_proof = request.headers.get("x-payment-proof")
 
         if not payment_proof:
-            return JSONResponse(
+            return Response(
+                content=payment_required_body,
                 status_code=402,
-                headers={
-                    "WWW-Authenticate": f'Solana realm="{config.realm}"',
-                    "X-Escrow-Address": "Required",
-                    "X-Price": f"{config.price} SOL",
-                    "X-Quality-Guarantee": "true" if config.quality_guarantee else "false",
-                    "X-Program-Id": config.program_id
-                },
-                content={
-                    "error": "Payment Required",
-                    "message": "This API requires payment via Solana escrow",
-                    "amount": config.price,
-                    "currency": "SOL",
-                    "escrow_program": config.program_id,
-                    "quality_guarantee": config.quality_guarantee,
-                    "payment_flow": {
-                        "step_1": "Create escrow with specified amount",
-                        "step_2": "Retry request with X-Payment-Proof header",
-                        "step_3": "Receive data with quality score",
-                        "step_4": "Automatic dispute if quality < threshold"
-                    }
-                }
+                headers=payment_required_headers,
+                media_type="application/json"
             )
 
         is_valid = await verify_escrow(
             payment_proof,
             config.program_id,
-            config.rpc_url
+            config.rpc_url,
+            get_rpc_client()
         )
 
         if not is_valid:
-            return JSONResponse(
+            return _JSONResponse(
                 status_code=403,
                 content={
                     "error": "Invalid Payment",
@@ -137,6 +279,7 @@ def x402_payment_middleware(config: X402Config) -> Callable:
         response = await call_next(request)
         return response
 
+    middleware.aclose = aclose
     return middleware
 
 
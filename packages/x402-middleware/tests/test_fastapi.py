@@ -0,0 +1,217 @@
+"""
+Tests for the FastAPI x402 payment middleware.
+
+The RPC node is replaced with an httpx MockTransport, so escrow checks
+run without network access.
+"""
+
+import asyncio
+import importlib.util
+import json
+import os
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("solders")
+
+import httpx
+from solders.keypair import Keypair
+
+# Load by path: the module name would otherwise shadow the fastapi package
+_spec = importlib.util.spec_from_file_location(
+    "x402_fastapi",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "fastapi.py")
+)
+x402_fastapi = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(x402_fastapi)
+
+PROGRAM_ID = str(Keypair().pubkey())
+RPC_URL = "https://rpc.example"
+
+
+class FakeRPC:
+    """getAccountInfo endpoint that records every request"""
+
+    def __init__(self, owner=PROGRAM_ID, delay=0.0):
+        self.owner = owner
+        self.delay = delay
+        self.requests = []
+
+    async def handler(self, request):
+        self.requests.append(json.loads(request.content))
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return httpx.Response(200, json={
+            "jsonrpc": "2.0",
+            "id": 1,
+            "result": {"value": {"owner": self.owner}}
+        })
+
+    def client(self):
+        return httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    x402_fastapi.invalidate_escrow_cache()
+    yield
+    x402_fastapi.invalidate_escrow_cache()
+
+
+def verify(escrow, client):
+    return x402_fastapi.verify_escrow(escrow, PROGRAM_ID, RPC_URL, client)
+
+
+class TestVerifyEscrow:
+    """Test escrow verification caching and request coalescing."""
+
+    def test_cache_hit_within_ttl(self):
+        """A verified escrow is served from cache until the TTL passes."""
+        rpc = FakeRPC()
+        escrow = str(Keypair().pubkey())
+
+        async def run():
+            async with rpc.client() as client:
+                assert await verify(escrow, client) is True
+                assert await verify(escrow, client) is True
+
+        asyncio.run(run())
+        assert len(rpc.requests) == 1
+
+        # Only account metadata is requested
+        params = rpc.requests[0]["params"]
+        assert params[0] == escrow
+        assert params[1]["dataSlice"] == {"offset": 0, "length": 0}
+
+    def test_cache_expires(self, monkeypatch):
+        """Entries older than the TTL are checked again."""
+        monkeypatch.setattr(x402_fastapi, "VERIFY_CACHE_TTL_SECONDS", 0)
+        rpc = FakeRPC()
+        escrow = str(Keypair().pubkey())
+
+        async def run():
+            async with rpc.client() as client:
+                await verify(escrow, client)
+                await verify(escrow, client)
+
+        asyncio.run(run())
+        assert len(rpc.requests) == 2
+
+    def test_cache_cleared_when_full(self, monkeypatch):
+        """A full cache is emptied rather than growing past its cap."""
+        monkeypatch.setattr(x402_fastapi, "VERIFY_CACHE_MAX_SIZE", 2)
+        rpc = FakeRPC()
+        escrows = [str(Keypair().pubkey()) for _ in range(3)]
+
+        async def run():
+            async with rpc.client() as client:
+                for escrow in escrows:
+                    await verify(escrow, client)
+
+        asyncio.run(run())
+        assert len(x402_fastapi._verified_escrows) == 1
+
+    def test_failures_not_cached(self):
+        """An escrow owned by another program is checked every time."""
+        rpc = FakeRPC(owner=str(Keypair().pubkey()))
+        escrow = str(Keypair().pubkey())
+
+        async def run():
+            async with rpc.client() as client:
+                assert await verify(escrow, client) is False
+                assert await verify(escrow, client) is False
+
+        asyncio.run(run())
+        assert len(rpc.requests) == 2
+        assert not x402_fastapi._verified_escrows
+
+    def test_concurrent_checks_share_one_call(self):
+        """Concurrent checks of one escrow make a single RPC call."""
+        rpc = FakeRPC(delay=0.05)
+        escrow = str(Keypair().pubkey())
+
+        async def run():
+            async with rpc.client() as client:
+                return await asyncio.gather(*(verify(escrow, client) for _ in range(10)))
+
+        assert asyncio.run(run()) == [True] * 10
+        assert len(rpc.requests) == 1
+        assert not x402_fastapi._pending_checks
+
+    def test_cancelled_leader_fails_waiters_closed(self):
+        """Waiters on a cancelled check get False instead of hanging."""
+        rpc = FakeRPC(delay=1.0)
+        escrow = str(Keypair().pubkey())
+
+        async def run():
+            async with rpc.client() as client:
+                leader = asyncio.create_task(verify(escrow, client))
+                await asyncio.sleep(0.01)
+                waiter = asyncio.create_task(verify(escrow, client))
+                await asyncio.sleep(0.01)
+                leader.cancel()
+                return await asyncio.wait_for(waiter, timeout=0.5)
+
+        assert asyncio.run(run()) is False
+        assert not x402_fastapi._pending_checks
+        assert not x402_fastapi._verified_escrows
+
+    @pytest.mark.parametrize("proof", ["", "short", "0" * 44, "1" * 45, "O" * 43])
+    def test_malformed_proofs_skip_rpc(self, proof):
+        """Proofs that can't be public keys are rejected without I/O."""
+        rpc = FakeRPC()
+
+        async def run():
+            async with rpc.client() as client:
+                return await verify(proof, client)
+
+        assert asyncio.run(run()) is False
+        assert rpc.requests == []
+
+
+class TestPaymentMiddleware:
+    """Test the middleware's 402 and 403 responses."""
+
+    @pytest.fixture
+    def middleware(self):
+        config = x402_fastapi.X402Config(
+            realm="test-api",
+            program_id=PROGRAM_ID,
+            rpc_url=RPC_URL,
+            price=0.001,
+            quality_guarantee=True
+        )
+        return x402_fastapi.x402_payment_middleware(config)
+
+    @staticmethod
+    def request(headers):
+        from types import SimpleNamespace
+        return SimpleNamespace(headers=headers, state=SimpleNamespace())
+
+    def test_missing_proof_returns_402(self, middleware):
+        """Requests without a proof get the same 402 challenge each time."""
+        async def call_next(request):
+            raise AssertionError("handler must not run")
+
+        first = asyncio.run(middleware(self.request({}), call_next))
+        second = asyncio.run(middleware(self.request({}), call_next))
+
+        assert first.status_code == second.status_code == 402
+        assert first.body == second.body
+        assert first.headers["x-price"] == "0.001 SOL"
+        assert first.headers["x-quality-guarantee"] == "true"
+
+        body = json.loads(first.body)
+        assert body["amount"] == 0.001
+        assert body["escrow_program"] == PROGRAM_ID
+
+    def test_invalid_proof_returns_403(self, middleware):
+        """A malformed proof is rejected with 403."""
+        async def call_next(request):
+            raise AssertionError("handler must not run")
+
+        response = asyncio.run(middleware(self.request({"x-payment-proof": "bad"}), call_next))
+
+        assert response.status_code == 403
+        assert json.loads(response.body)["provided"] == "bad"